@@ -0,0 +1,183 @@
+# balance_store.py
+# Версіоноване сховище балансів (MVCC) для узгодженого читання під час платежів.
+#
+# Кожна фіксація змін отримує новий номер версії; для кожного рахунку зберігається
+# історія (версія, баланс). Читач закріплює знімок - номер версії - і бачить
+# баланси всіх рахунків станом на цю версію, тоді як писачі продовжують фіксувати
+# нові версії без очікування на читачів.
+
+import threading
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from payment_strategies import PaymentStrategy
+
+# Історія рахунку: (версії, баланси). Списки лише доповнюються писачем;
+# при очищенні старих версій пара замінюється новою (copy-on-write),
+# тому читач, що вже отримав посилання, ніколи не бачить зсунутих індексів.
+_History = Tuple[List[int], List[float]]
+
+
+class BalanceSnapshot:
+    """
+    Узгоджений знімок балансів на певній версії сховища.
+    Після використання знімок слід звільнити (release або with).
+    """
+    def __init__(self, store: "BalanceStore", version: int):
+        self._store = store
+        self.version = version
+        self._released = False
+
+    def get(self, account_id: int) -> Optional[float]:
+        """Баланс рахунку на момент знімка або None, якщо рахунку тоді ще не було."""
+        history = self._store._histories.get(account_id)
+        if history is None:
+            return None
+        versions, balances = history
+        index = bisect_right(versions, self.version) - 1
+        return balances[index] if index >= 0 else None
+
+    def __getitem__(self, account_id: int) -> float:
+        balance = self.get(account_id)
+        if balance is None:
+            raise KeyError(account_id)
+        return balance
+
+    def items(self) -> Iterator[Tuple[int, float]]:
+        for account_id in list(self._store._histories):
+            balance = self.get(account_id)
+            if balance is not None:
+                yield account_id, balance
+
+    def total(self) -> float:
+        return sum(balance for _, balance in self.items())
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._store._unpin(self.version)
+
+    def __enter__(self) -> "BalanceSnapshot":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class BalanceStore:
+    """
+    Сховище балансів рахунків з версіями.
+
+    Стратегії, зареєстровані через register(), автоматично фіксують кожну зміну
+    свого balance. Зміни кількох рахунків у межах transaction() фіксуються
+    однією версією, тож знімки бачать їх або всі, або жодної.
+    """
+    def __init__(self, gc_interval: int = 1024):
+        self._histories: Dict[int, _History] = {}
+        self._version = 0
+        self._next_account_id = 1
+        self._write_lock = threading.Lock()
+        self._pins: Dict[int, int] = {}
+        self._dirty: set = set()
+        self._commits_since_gc = 0
+        self._gc_interval = gc_interval
+        self._local = threading.local()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def register(self, strategy: PaymentStrategy) -> int:
+        """Підключає стратегію до сховища та фіксує її поточний баланс."""
+        if strategy._balance_store is not None:
+            raise ValueError("Платіжний метод вже підключено до сховища балансів.")
+        with self._write_lock:
+            account_id = self._next_account_id
+            self._next_account_id += 1
+        strategy._balance_store = self
+        strategy._balance_account_id = account_id
+        self.record(account_id, strategy.balance)
+        return account_id
+
+    def record(self, account_id: int, balance: float):
+        """Фіксує новий баланс рахунку (або додає його до відкритої транзакції)."""
+        pending = getattr(self._local, "pending", None)
+        if pending is not None:
+            pending[account_id] = balance
+        else:
+            self.commit({account_id: balance})
+
+    def commit(self, updates: Dict[int, float]) -> int:
+        """Атомарно фіксує зміни кількох рахунків однією новою версією."""
+        if not updates:
+            return self._version
+        with self._write_lock:
+            version = self._version + 1
+            for account_id, balance in updates.items():
+                history = self._histories.get(account_id)
+                if history is None:
+                    self._histories[account_id] = ([version], [balance])
+                else:
+                    # Спочатку баланс, потім версія: читач шукає лише за версіями
+                    history[1].append(balance)
+                    history[0].append(version)
+                self._dirty.add(account_id)
+            # Публікація версії - останній крок, після неї зміни стають видимими знімкам
+            self._version = version
+            self._commits_since_gc += 1
+            if self._commits_since_gc >= self._gc_interval:
+                self._collect_locked()
+        return version
+
+    @contextmanager
+    def transaction(self):
+        """
+        Накопичує зміни балансів поточного потоку та фіксує їх однією версією.
+        При винятку накопичені зміни відкидаються; відновлення самих об'єктів
+        стратегій - відповідальність коду, що змінював баланси.
+        """
+        if getattr(self._local, "pending", None) is not None:
+            # Вкладена транзакція стає частиною зовнішньої
+            yield
+            return
+        self._local.pending = {}
+        try:
+            yield
+            pending = self._local.pending
+            self._local.pending = None
+            self.commit(pending)
+        finally:
+            self._local.pending = None
+
+    def snapshot(self) -> BalanceSnapshot:
+        """Закріплює поточну версію для узгодженого читання."""
+        with self._write_lock:
+            version = self._version
+            self._pins[version] = self._pins.get(version, 0) + 1
+        return BalanceSnapshot(self, version)
+
+    def _unpin(self, version: int):
+        with self._write_lock:
+            count = self._pins[version] - 1
+            if count:
+                self._pins[version] = count
+            else:
+                del self._pins[version]
+
+    def collect(self):
+        """Видаляє версії, які вже не може побачити жоден знімок."""
+        with self._write_lock:
+            self._collect_locked()
+
+    def _collect_locked(self):
+        horizon = min(self._pins) if self._pins else self._version
+        for account_id in self._dirty:
+            versions, balances = self._histories[account_id]
+            # Залишаємо останній запис, видимий на горизонті, та всі новіші
+            keep_from = max(0, bisect_right(versions, horizon) - 1)
+            if keep_from:
+                self._histories[account_id] = (versions[keep_from:], balances[keep_from:])
+        self._dirty = {account_id for account_id in self._dirty
+                       if len(self._histories[account_id][0]) > 1}
+        self._commits_since_gc = 0
@@ -2,18 +2,54 @@
 # та розробка через тестування (TDD) з модульними та інтеграційними тестами
 # для системи обробки платежів
 
-from payment_strategies import (
-    CreditCardPaymentStrategy,
-    PayPalPaymentStrategy,
-    CryptoPaymentStrategy,
-    PaymentStrategy
-)
+from payment_strategies import PaymentStrategy
 from payment_processor import PaymentProcessor
-from typing import List, Optional
+from providers import PaymentProvider, ProviderError, get_provider, list_providers, provider_for
+from typing import Any, Dict, List, Optional, TextIO, Tuple
+import argparse
+import contextlib
+import io
+import json
+import math
+import sys
 
 saved_payment_methods: List[PaymentStrategy] = []
 processor = PaymentProcessor()
 
+LIST_PAGE_SIZE = 20
+
+# Індекси для посторінкового перегляду: позиції в saved_payment_methods
+_fundable_positions: List[int] = []
+_methods_by_type: Dict[str, List[int]] = {}
+_indexed_count = 0
+# Кеш описів: позиція -> (баланс на момент побудови, готовий рядок)
+_descriptor_cache: Dict[int, Tuple[Optional[float], str]] = {}
+
+
+def add_payment_method(strategy: PaymentStrategy) -> PaymentStrategy:
+    """Зберігає платіжний метод. Спільна точка для меню та сценарного режиму."""
+    saved_payment_methods.append(strategy)
+    return strategy
+
+
+def make_payment(strategy: PaymentStrategy, amount: float) -> bool:
+    """Здійснює платіж обраним методом через спільний процесор."""
+    processor.set_strategy(strategy)
+    print(f"\nОбробка платежу...")
+    if processor.process_payment(amount):
+        print(">>>> Платіж успішно оброблено! <<<<")
+        return True
+    print(">>>> Не вдалося обробити платіж. <<<<")
+    return False
+
+
+def add_funds_to_account(strategy: PaymentStrategy, amount: float) -> bool:
+    """Поповнює баланс рахунку. Повідомлення про помилку виводить сам метод add_funds."""
+    if processor.add_funds(strategy, amount):
+        print("Поповнення успішне!")
+        return True
+    return False
+
 
 def display_main_menu():
     print("\nГоловне меню:")
@@ -26,9 +62,8 @@ def display_main_menu():
 
 def display_add_method_menu():
     print("\nОберіть тип платіжного методу для додавання:")
-    print("1. Кредитна картка")
-    print("2. PayPal")
-    print("3. Криптовалютний гаманець")
+    for number, provider in enumerate(list_providers(), start=1):
+        print(f"{number}. {provider.title}")
     print("0. Повернутися до головного меню")
 
 
@@ -48,141 +83,221 @@ def get_initial_balance_from_user() -> float:
             print("Некоректний формат балансу. Введіть число (наприклад, 50.25).")
 
 
-def handle_add_credit_card():
-    print("\n--- Додавання кредитної картки ---")
+def handle_add_method(provider: PaymentProvider):
+    """Додає платіжний метод будь-якого зареєстрованого постачальника."""
+    print(f"\n--- Додавання: {provider.title} ---")
     try:
-        card_number = input("Введіть номер картки: ")
-        expiry_date = input("Введіть термін дії (ММ/РР): ")
-        cvv = input("Введіть CVV/CVC: ")
-        if not card_number or not expiry_date or not cvv:
-            print("Помилка: Всі поля картки є обов'язковими.")
+        values = {name: input(prompt) for name, prompt in provider.fields}
+        if not all(values.values()):
+            print("Помилка: Всі поля є обов'язковими.")
             return
         initial_balance = get_initial_balance_from_user()
-        strategy = CreditCardPaymentStrategy(card_number, expiry_date, cvv, initial_balance)
-        saved_payment_methods.append(strategy)
-        print(f"Кредитна картка ...{card_number[-4:]} додана. Баланс: ${strategy.balance:.2f}")
-    except ValueError as e:
+        strategy = add_payment_method(provider.create_strategy(values, initial_balance))
+        print(f"Додано: {provider.describe(strategy)}. Баланс: ${strategy.balance:.2f}")
+    except (ValueError, ProviderError) as e:
         print(f"Помилка: {e}")
     except Exception as e:
         print(f"Невідома помилка: {e}")
 
 
+def handle_add_credit_card():
+    handle_add_method(get_provider("card"))
+
+
 def handle_add_paypal():
-    print("\n--- Додавання PayPal акаунту ---")
-    try:
-        email = input("Введіть email для PayPal: ")
-        if not email:
-            print("Помилка: Email є обов'язковим.")
-            return
-        initial_balance = get_initial_balance_from_user()  # Запитуємо баланс
-        strategy = PayPalPaymentStrategy(email, initial_balance)  # Передаємо баланс
-        saved_payment_methods.append(strategy)
-        print(f"PayPal акаунт {email} доданий. Баланс: ${strategy.balance:.2f}")
-    except ValueError as e:
-        print(f"Помилка: {e}")
-    except Exception as e:
-        print(f"Невідома помилка: {e}")
+    handle_add_method(get_provider("paypal"))
 
 
 def handle_add_crypto_wallet():
-    print("\n--- Додавання криптовалютного гаманця ---")
-    try:
-        wallet_address = input("Введіть адресу криптовалютного гаманця: ")
-        if not wallet_address:
-            print("Помилка: Адреса гаманця є обов'язковою.")
-            return
-        initial_balance = get_initial_balance_from_user()  # Запитуємо баланс
-        strategy = CryptoPaymentStrategy(wallet_address, initial_balance)  # Передаємо баланс
-        saved_payment_methods.append(strategy)
-        print(f"Крипто-гаманець {wallet_address[:6]}... доданий. Баланс: ${strategy.balance:.2f}")
-    except ValueError as e:
-        print(f"Помилка: {e}")
-    except Exception as e:
-        print(f"Невідома помилка: {e}")
+    handle_add_method(get_provider("crypto"))
+
+
+def _method_type_name(method: PaymentStrategy) -> str:
+    return method.__class__.__name__.replace("PaymentStrategy", "")
+
 
+def _is_fundable(method: PaymentStrategy) -> bool:
+    # Поповнення підтримують лише методи зареєстрованих постачальників, які його заявили
+    provider = provider_for(method)
+    return provider is not None and provider.supports_add_funds
 
-def list_saved_methods(filter_for_add_funds: bool = False) -> List[PaymentStrategy]:
+
+def _sync_method_indexes():
+    """
+    Індексує методи, додані після останньої синхронізації.
+    Список методів лише доповнюється, тому достатньо пройти його хвіст.
     """
-    Відображає список збережених платіжних методів.
-    Якщо filter_for_add_funds=True, показує тільки ті, що підтримують add_funds.
+    global _indexed_count
+    for position in range(_indexed_count, len(saved_payment_methods)):
+        method = saved_payment_methods[position]
+        _methods_by_type.setdefault(_method_type_name(method), []).append(position)
+        if _is_fundable(method):
+            _fundable_positions.append(position)
+    _indexed_count = len(saved_payment_methods)
+
+
+def clear_saved_methods():
+    """Видаляє всі збережені методи разом з індексами та кешем описів."""
+    global _indexed_count
+    saved_payment_methods.clear()
+    _fundable_positions.clear()
+    _methods_by_type.clear()
+    _descriptor_cache.clear()
+    _indexed_count = 0
+
+
+class _AllPositions:
+    """Послідовність 0..len(saved_payment_methods)-1 без побудови списку."""
+    def __len__(self) -> int:
+        return len(saved_payment_methods)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return range(len(self))[item]
+        if not (0 <= item < len(self)):
+            raise IndexError(item)
+        return item
+
+
+def _filtered_positions(filter_for_add_funds: bool = False, method_type: Optional[str] = None) -> List[int]:
+    _sync_method_indexes()
+    if method_type is not None:
+        positions = _methods_by_type.get(method_type, [])
+        if filter_for_add_funds and positions and not _is_fundable(saved_payment_methods[positions[0]]):
+            return []
+        return positions
+    if filter_for_add_funds:
+        return _fundable_positions
+    return _AllPositions()
+
+
+def count_saved_methods(filter_for_add_funds: bool = False, method_type: Optional[str] = None) -> int:
+    return len(_filtered_positions(filter_for_add_funds, method_type))
+
+
+def get_saved_method(number: int, filter_for_add_funds: bool = False,
+                     method_type: Optional[str] = None) -> Optional[PaymentStrategy]:
+    """Повертає метод за номером (з 1) у відфільтрованому списку або None."""
+    positions = _filtered_positions(filter_for_add_funds, method_type)
+    if not (1 <= number <= len(positions)):
+        return None
+    return saved_payment_methods[positions[number - 1]]
+
+
+def describe_method(position: int) -> str:
+    """
+    Повертає готовий рядок опису методу. Опис кешується і перебудовується
+    лише тоді, коли змінився баланс методу.
+    """
+    method = saved_payment_methods[position]
+    balance = getattr(method, "balance", None)
+    cached = _descriptor_cache.get(position)
+    if cached is not None and cached[0] == balance:
+        return cached[1]
+
+    balance_info = method.get_balance_info()
+    provider = provider_for(method)
+    details = provider.describe(method) if provider else ""
+    if balance_info:
+        details += f", {balance_info}"
+
+    descriptor = f"{_method_type_name(method)} ({details})"
+    _descriptor_cache[position] = (balance, descriptor)
+    return descriptor
+
+
+def list_methods_page(cursor: int = 0, limit: Optional[int] = None, filter_for_add_funds: bool = False,
+                      method_type: Optional[str] = None) -> Tuple[List[Tuple[int, str, PaymentStrategy]], Optional[int]]:
+    """
+    Повертає сторінку методів як список (номер, опис, метод) та курсор наступної
+    сторінки (None, якщо це остання). Вартість - O(розмір сторінки).
+    """
+    positions = _filtered_positions(filter_for_add_funds, method_type)
+    total = len(positions)
+    cursor = max(0, cursor)
+    end = total if limit is None else min(total, cursor + limit)
+    page = [
+        (number + 1, describe_method(position), saved_payment_methods[position])
+        for number, position in zip(range(cursor, end), positions[cursor:end])
+    ]
+    return page, (end if end < total else None)
+
+
+def list_saved_methods(filter_for_add_funds: bool = False, cursor: int = 0, limit: Optional[int] = None,
+                       method_type: Optional[str] = None) -> List[PaymentStrategy]:
+    """
+    Відображає сторінку збережених платіжних методів.
+    Якщо filter_for_add_funds=True, показує тільки ті, що підтримують add_funds;
+    method_type обмежує вибірку одним типом (наприклад, "PayPal").
+    Номери методів наскрізні для всього відфільтрованого списку.
     Повертає список відображених методів.
     """
     print("\n--- Збережені платіжні методи ---")
 
-    displayable_methods = []
-    if filter_for_add_funds:
-        for method in saved_payment_methods:
-            # Перевіряємо, чи метод не є базовим PaymentStrategy і чи він перевизначив add_funds
-            # або чи це CreditCardPaymentStrategy, яка точно має add_funds
-            # Простіший спосіб: перевірити, чи метод повертає щось інше, ніж False від базового класу
-            # Але для наочності зробимо явну перевірку на типи, які ми точно зробили поповнюваними
-            if isinstance(method, (CreditCardPaymentStrategy, PayPalPaymentStrategy, CryptoPaymentStrategy)):
-                displayable_methods.append(method)
-    else:
-        displayable_methods = list(saved_payment_methods)
-
-    if not displayable_methods:
-        if filter_for_add_funds:
+    page, next_cursor = list_methods_page(cursor, limit, filter_for_add_funds, method_type)
+    if not page:
+        if cursor > 0:
+            print("На цій сторінці немає методів.")
+        elif filter_for_add_funds:
             print("У вас немає рахунків, які можна поповнити.")
         else:
             print("У вас ще немає збережених платіжних методів.")
         return []
 
-    for i, method in enumerate(displayable_methods):
-        method_type_name = method.__class__.__name__.replace("PaymentStrategy", "")
-        balance_info = method.get_balance_info()
-        details = ""
+    for number, descriptor, _ in page:
+        print(f"{number}. {descriptor}")
+    if next_cursor is not None:
+        remaining = count_saved_methods(filter_for_add_funds, method_type) - next_cursor
+        print(f"... ще {remaining} метод(ів) на наступних сторінках.")
+    return [method for _, _, method in page]
 
-        if isinstance(method, CreditCardPaymentStrategy):
-            details = f"Картка ...{method.card_number[-4:]}"
-        elif isinstance(method, PayPalPaymentStrategy):
-            details = f"PayPal: {method.email}"
-        elif isinstance(method, CryptoPaymentStrategy):
-            details = f"Гаманець: {method.wallet_address[:6]}..."
 
-        if balance_info:
-            details += f", {balance_info}"
-
-        print(f"{i + 1}. {method_type_name} ({details})")
-    return displayable_methods
+def _prompt_method_number(prompt: str, filter_for_add_funds: bool = False) -> Optional[str]:
+    """
+    Показує методи сторінками по LIST_PAGE_SIZE і запитує номер.
+    'n' перемикає на наступну сторінку. Повертає введений рядок
+    або None, якщо методів немає.
+    """
+    total = count_saved_methods(filter_for_add_funds)
+    cursor = 0
+    while True:
+        if not list_saved_methods(filter_for_add_funds, cursor, LIST_PAGE_SIZE):
+            return None
+        has_next = cursor + LIST_PAGE_SIZE < total
+        hint = ", n - наступна сторінка" if has_next else ""
+        choice_str = input(f"{prompt} (1-{total}{hint}): ")
+        if has_next and choice_str.strip().lower() == "n":
+            cursor += LIST_PAGE_SIZE
+            continue
+        return choice_str
 
 
 def handle_add_funds():  # Перейменовано з handle_add_funds_to_card
     """Обробляє поповнення балансу обраного рахунку."""
     print("\n--- Поповнення балансу рахунку ---")
 
-    # Показуємо тільки ті методи, які підтримують поповнення
-    accounts_to_fund = list_saved_methods(filter_for_add_funds=True)
-    if not accounts_to_fund:
-        print("--> Немає рахунків для поповнення. Повернення до головного меню.")
-        return
-
     try:
-        choice_str = input(f"Оберіть номер рахунку для поповнення (1-{len(accounts_to_fund)}): ")
+        # Показуємо тільки ті методи, які підтримують поповнення
+        choice_str = _prompt_method_number("Оберіть номер рахунку для поповнення", filter_for_add_funds=True)
+        if choice_str is None:
+            print("--> Немає рахунків для поповнення. Повернення до головного меню.")
+            return
         if not choice_str.isdigit():
             print("Некоректний вибір. Будь ласка, введіть число.")
             return
 
-        account_index = int(choice_str) - 1
-        if not (0 <= account_index < len(accounts_to_fund)):
+        selected_account = get_saved_method(int(choice_str), filter_for_add_funds=True)
+        if selected_account is None:
             print("Некоректний номер рахунку.")
             return
 
-        selected_account = accounts_to_fund[account_index]
-
         amount_str = input("Введіть суму для поповнення: ")
         if not amount_str.replace('.', '', 1).isdigit() or float(amount_str) <= 0:
             print("Некоректна сума. Сума має бути позитивним числом.")
             return
 
         amount_to_add = float(amount_str)
-
-        # Викликаємо метод add_funds, який тепер є у всіх потрібних стратегіях
-        if selected_account.add_funds(amount_to_add):
-            print("Поповнення успішне!")
-        else:
-            # Повідомлення про помилку буде виведено з самого методу add_funds
-            pass
+        add_funds_to_account(selected_account, amount_to_add)
 
     except ValueError:
         print("Помилка: Будь ласка, введіть числове значення для вибору або суми.")
@@ -193,30 +308,24 @@ def handle_add_funds():  # Перейменовано з handle_add_funds_to_car
 def handle_make_payment():
     print("\n--- Здійснення платежу ---")
 
-    available_methods = list_saved_methods()
-    if not available_methods:
-        print("--> У вас немає збережених платіжних методів. Додайте спочатку метод.")
-        return
-
     try:
-        choice_str = input(f"Оберіть номер платіжного методу (1-{len(available_methods)}): ")
+        choice_str = _prompt_method_number("Оберіть номер платіжного методу")
+        if choice_str is None:
+            print("--> У вас немає збережених платіжних методів. Додайте спочатку метод.")
+            return
         if not choice_str.isdigit():
             print("Некоректний вибір.")
             return
 
-        method_index = int(choice_str) - 1
-        if not (0 <= method_index < len(available_methods)):
+        selected_strategy = get_saved_method(int(choice_str))
+        if selected_strategy is None:
             print("Некоректний номер методу.")
             return
 
-        selected_strategy = available_methods[method_index]
-        processor.set_strategy(selected_strategy)
-
         # Для крипто, amount_to_send це сума яку отримає отримувач
         # Для інших - загальна сума списання
-        prompt_message = "Введіть суму платежу: "
-        if isinstance(selected_strategy, CryptoPaymentStrategy):
-            prompt_message = "Введіть суму, яку має отримати отримувач (комісія буде додана): "
+        provider = provider_for(selected_strategy)
+        prompt_message = provider.amount_prompt if provider else "Введіть суму платежу: "
 
         amount_str = input(prompt_message)
         if not amount_str.replace('.', '', 1).isdigit() or float(amount_str) <= 0:
@@ -224,12 +333,7 @@ def handle_make_payment():
             return
 
         amount = float(amount_str)
-
-        print(f"\nОбробка платежу...")
-        if processor.process_payment(amount):
-            print(">>>> Платіж успішно оброблено! <<<<")
-        else:
-            print(">>>> Не вдалося обробити платіж. <<<<")
+        make_payment(selected_strategy, amount)
 
     except ValueError:
         print("Помилка: Будь ласка, введіть числове значення.")
@@ -247,14 +351,11 @@ def main_loop():
             while True:
                 display_add_method_menu()
                 method_choice = input("Оберіть тип методу: ")
-                if method_choice == '1':
-                    handle_add_credit_card()
-                elif method_choice == '2':
-                    handle_add_paypal()
-                elif method_choice == '3':
-                    handle_add_crypto_wallet()
-                elif method_choice == '0':
+                providers = list_providers()
+                if method_choice == '0':
                     break
+                elif method_choice.isdigit() and 1 <= int(method_choice) <= len(providers):
+                    handle_add_method(providers[int(method_choice) - 1])
                 else:
                     print("Некоректний вибір, спробуйте ще раз.")
         elif choice == '2':
@@ -270,6 +371,179 @@ def main_loop():
             print("Некоректний вибір, спробуйте ще раз.")
 
 
+# --- Сценарний (неінтерактивний) режим ---
+# Команди, по одній на рядок (# - коментар):
+#   add card <номер> <ММ/РР> <CVV> [баланс]
+#   add paypal <email> [баланс]
+#   add crypto <адреса> [баланс]
+#   add <постачальник> <поля постачальника...> [баланс]
+#   list [fundable]
+#   pay <номер методу> <сума>
+#   topup <номер методу> <сума>
+# Замість текстової команди рядок може містити JSON операцію, наприклад
+# {"op": "pay", "method": 1, "amount": 10.5}, а весь сценарій - JSON масив операцій.
+
+def _parse_text_command(tokens: List[str]) -> Dict[str, Any]:
+    name = tokens[0].lower()
+    if name == "add":
+        provider = get_provider(tokens[1]) if len(tokens) > 1 else None
+        if provider is None:
+            keys = "|".join(provider.key for provider in list_providers())
+            raise ValueError(f"очікується 'add {keys} ...'")
+        fields = provider.field_names
+        values = tokens[2:]
+        if len(values) not in (len(fields), len(fields) + 1):
+            raise ValueError(f"'add {tokens[1]}' очікує: {' '.join(fields)} [баланс]")
+        op = {"op": "add", "type": tokens[1]}
+        op.update(zip(fields, values))
+        if len(values) > len(fields):
+            op["initial_balance"] = values[-1]
+        return op
+    if name == "list":
+        return {"op": "list", "fundable": len(tokens) > 1 and tokens[1] == "fundable"}
+    if name in ("pay", "topup"):
+        if len(tokens) != 3:
+            raise ValueError(f"'{name}' очікує: <номер методу> <сума>")
+        return {"op": name, "method": tokens[1], "amount": tokens[2]}
+    raise ValueError(f"невідома команда '{name}'")
+
+
+def _finite_number(value: Any, field: str) -> float:
+    number = float(value)
+    if not math.isfinite(number):
+        raise ValueError(f"{field} має бути скінченним числом")
+    return number
+
+
+def _normalize_script_op(op: Any) -> Dict[str, Any]:
+    """Перевіряє операцію та приводить числові поля до потрібних типів."""
+    if not isinstance(op, dict) or "op" not in op:
+        raise ValueError("операція має бути об'єктом з полем 'op'")
+    op = dict(op)
+    name = op["op"]
+    if name == "add":
+        provider = get_provider(op.get("type"))
+        if provider is None:
+            raise ValueError(f"невідомий тип методу '{op.get('type')}'")
+        fields = provider.field_names
+        missing = [field for field in fields if not op.get(field)]
+        if missing:
+            raise ValueError(f"відсутні поля: {', '.join(missing)}")
+        not_strings = [field for field in fields if not isinstance(op[field], str)]
+        if not_strings:
+            raise ValueError(f"поля мають бути рядками: {', '.join(not_strings)}")
+        op["initial_balance"] = _finite_number(op.get("initial_balance", 0.0), "initial_balance")
+    elif name in ("pay", "topup"):
+        op["method"] = int(op.get("method"))
+        op["amount"] = _finite_number(op.get("amount"), "amount")
+    elif name == "list":
+        op["fundable"] = bool(op.get("fundable", False))
+    else:
+        raise ValueError(f"невідома операція '{name}'")
+    return op
+
+
+def parse_script(text: str) -> List[Dict[str, Any]]:
+    """
+    Розбирає весь сценарій до виконання, тож синтаксична помилка
+    в будь-якому рядку не залишає систему в напіввиконаному стані.
+    """
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        try:
+            raw_ops = json.loads(stripped)
+        except ValueError as e:
+            raise ValueError(f"Некоректний JSON сценарій: {e}")
+        ops = []
+        for i, raw_op in enumerate(raw_ops, start=1):
+            try:
+                ops.append(_normalize_script_op(raw_op))
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Операція {i}: {e}")
+        return ops
+
+    ops = []
+    for line_no, line in enumerate(text.splitlines(), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            raw_op = json.loads(line) if line.startswith("{") else _parse_text_command(line.split())
+            ops.append(_normalize_script_op(raw_op))
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"Рядок {line_no}: {e}")
+    return ops
+
+
+def execute_script_op(op: Dict[str, Any]) -> bool:
+    """Виконує одну розібрану операцію тими ж обробниками, що й меню."""
+    name = op["op"]
+    if name == "add":
+        try:
+            add_payment_method(get_provider(op["type"]).create_strategy(op, op["initial_balance"]))
+            return True
+        except (ValueError, ProviderError) as e:
+            print(f"Помилка: {e}")
+            return False
+    if name == "list":
+        list_saved_methods(filter_for_add_funds=op["fundable"])
+        return True
+
+    method_index = op["method"] - 1
+    if not (0 <= method_index < len(saved_payment_methods)):
+        print("Некоректний номер методу.")
+        return False
+    strategy = saved_payment_methods[method_index]
+    if name == "pay":
+        return make_payment(strategy, op["amount"])
+    return add_funds_to_account(strategy, op["amount"])
+
+
+def run_script(text: str, output: Optional[TextIO] = None) -> List[bool]:
+    """
+    Виконує сценарій без відображення меню. Повертає результат кожної операції.
+    Якщо задано output, весь вивід накопичується в пам'яті й записується одним блоком.
+    """
+    ops = parse_script(text)
+    if output is None:
+        return [execute_script_op(op) for op in ops]
+
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        results = [execute_script_op(op) for op in ops]
+    output.write(buffer.getvalue())
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Консольна програма керування платежами.")
+    parser.add_argument("--script", help="Файл сценарію ('-' - стандартний ввід) для неінтерактивного режиму.")
+    parser.add_argument("--output", help="Файл для виводу сценарного режиму.")
+    args = parser.parse_args(argv)
+
+    if not args.script:
+        print("Вітаємо у консольній програмі керування платежами!")
+        main_loop()
+        return
+
+    if args.script == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.script, encoding="utf-8") as script_file:
+            text = script_file.read()
+    try:
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as output_file:
+                results = run_script(text, output_file)
+        else:
+            results = run_script(text)
+    except ValueError as e:
+        print(f"Помилка сценарію: {e}", file=sys.stderr)
+        sys.exit(2)
+    failed = results.count(False)
+    print(f"Виконано операцій: {len(results)}, невдалих: {failed}", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
 if __name__ == "__main__":
-    print("Вітаємо у консольній програмі керування платежами!")
-    main_loop()
\ No newline at end of file
+    main()
\ No newline at end of file
@@ -0,0 +1,138 @@
+# fake_provider_server.py
+# Локальний фейковий зовнішній платіжний постачальник для тестування.
+#
+# HTTP/1.1 сервер з keep-alive, що веде баланси рахунків у пам'яті:
+#   POST /accounts  {"account": "acc-1", "balance": 100.0}  -> 201
+#   POST /charge    {"account": "acc-1", "amount": 10.0}    -> 200 {"ok": true, "balance": 90.0}
+#   POST /credit    {"account": "acc-1", "amount": 10.0}    -> 200 {"ok": true, "balance": 100.0}
+# Лічильник connections_opened дозволяє перевірити, що клієнт перевикористовує з'єднання.
+# Повтор запиту з тим самим заголовком Idempotency-Key повертає збережену відповідь
+# без повторного застосування. idle_timeout закриває з'єднання після простою.
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class FakeProviderServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], idle_timeout: Optional[float] = None):
+        super().__init__(address, _FakeProviderHandler)
+        self.idle_timeout = idle_timeout
+        self.response_delay = 0.0  # Імітація повільного постачальника (с)
+        self.accounts: Dict[str, float] = {}
+        self.accounts_lock = threading.RLock()  # повторно захоплюється в handle_operation
+        self._responses: Dict[str, Tuple[int, Dict[str, Any]]] = {}  # за Idempotency-Key
+        self.connections_opened = 0
+        self.requests_handled = 0
+
+    def process_request(self, request, client_address):
+        with self.accounts_lock:
+            self.connections_opened += 1
+        super().process_request(request, client_address)
+
+    def handle_operation(self, path: str, payload: Dict[str, Any],
+                         idempotency_key: Optional[str] = None) -> Tuple[int, Dict[str, Any]]:
+        if idempotency_key is None:
+            return self._apply_operation(path, payload)
+        with self.accounts_lock:
+            cached = self._responses.get(idempotency_key)
+            if cached is None:
+                cached = self._responses[idempotency_key] = self._apply_operation(path, payload)
+            return cached
+
+    def _apply_operation(self, path: str, payload: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        account = payload.get("account")
+        if not isinstance(account, str) or not account:
+            return 400, {"error": "Поле account є обов'язковим."}
+        try:
+            amount = float(payload.get("amount", payload.get("balance", 0.0)))
+        except (TypeError, ValueError):
+            return 400, {"error": "Сума має бути числом."}
+        if amount < 0:
+            return 400, {"error": "Сума не може бути негативною."}
+
+        with self.accounts_lock:
+            self.requests_handled += 1
+            if path == "/accounts":
+                if account in self.accounts:
+                    return 409, {"error": f"Рахунок {account} вже існує."}
+                self.accounts[account] = amount
+                return 201, {"ok": True, "balance": amount}
+            if account not in self.accounts:
+                return 404, {"error": f"Рахунок {account} не знайдено."}
+            balance = self.accounts[account]
+            if path == "/charge":
+                if amount > balance:
+                    return 200, {"ok": False, "balance": balance}
+                balance -= amount
+            elif path == "/credit":
+                balance += amount
+            else:
+                return 404, {"error": f"Невідомий шлях: {path}"}
+            self.accounts[account] = balance
+            return 200, {"ok": True, "balance": balance}
+
+
+class _FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive за замовчуванням
+    disable_nagle_algorithm = True  # заголовки й тіло йдуть окремими записами
+
+    def setup(self):
+        self.timeout = self.server.idle_timeout  # None - з'єднання не закриваються через простій
+        super().setup()
+
+    def do_POST(self):
+        if self.server.response_delay:
+            time.sleep(self.server.response_delay)
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            payload = None
+        if isinstance(payload, dict):
+            status, response = self.server.handle_operation(self.path, payload,
+                                                            self.headers.get("Idempotency-Key"))
+        else:
+            status, response = 400, {"error": "Некоректний JSON."}
+        body = json.dumps(response, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_provider(host: str = "127.0.0.1", port: int = 0,
+                        idle_timeout: Optional[float] = None) -> FakeProviderServer:
+    """Запускає сервер у фоновому потоці (port=0 - вільний порт)."""
+    server = FakeProviderServer((host, port), idle_timeout)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    return server
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Фейковий зовнішній платіжний постачальник.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--idle-timeout", type=float, help="Закривати з'єднання після простою (с).")
+    args = parser.parse_args(argv)
+    server = FakeProviderServer((args.host, args.port), args.idle_timeout)
+    print(f"Фейковий постачальник слухає на http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Постачальника зупинено.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+# fraud_scoring.py
+# Оцінка ризику платежу перед передачею його стратегії.
+#
+# Ознаки кожного рахунку (кількість платежів, середня сума, дисперсія, час
+# останнього платежу, тип методу, ідентичність) підтримуються інкрементально:
+# оцінка платежу - O(1) і не переглядає історію.
+
+import math
+import time
+import weakref
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from payment_strategies import PaymentStrategy
+
+APPROVE = "approve"
+FLAG = "flag"
+DECLINE = "decline"
+
+
+class ScoreResult(NamedTuple):
+    score: float
+    decision: str
+    reasons: Tuple[str, ...]
+
+
+class AccountFeatures:
+    """Інкрементальні ознаки рахунку (середнє та дисперсія - за алгоритмом Велфорда)."""
+    __slots__ = ("identity", "method_risk", "count", "mean", "m2", "last_payment_at")
+
+    def __init__(self, identity: Optional[str], method_risk: float):
+        self.identity = identity
+        self.method_risk = method_risk
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.last_payment_at: Optional[float] = None
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def update(self, amount: float, now: float):
+        self.count += 1
+        delta = amount - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (amount - self.mean)
+        self.last_payment_at = now
+
+
+class FraudScorer:
+    """
+    Оцінює платіж сумою внесків окремих ознак (0..1):
+    незвична сума відносно історії рахунку, частота платежів,
+    ризик типу методу та чорний список email/гаманців.
+    """
+    DEFAULT_METHOD_RISK = {
+        "CreditCardPaymentStrategy": 0.0,
+        "PayPalPaymentStrategy": 0.05,
+        "CryptoPaymentStrategy": 0.2,
+    }
+    NEW_ACCOUNT_RISK = 0.1     # Рахунок без історії платежів
+    MIN_HISTORY = 3            # Після скількох платежів довіряємо статистиці суми
+    AMOUNT_Z_START = 3.0       # z-оцінка, з якої сума вважається підозрілою
+    AMOUNT_Z_FULL = 8.0        # z-оцінка, що дає повний внесок AMOUNT_WEIGHT
+    AMOUNT_WEIGHT = 0.6
+    VELOCITY_WINDOW = 5.0      # с; платежі частіше за це вікно підвищують ризик
+    VELOCITY_WEIGHT = 0.3
+
+    def __init__(self, flag_threshold: float = 0.5, decline_threshold: float = 0.8,
+                 blocklist: Iterable[str] = (), method_risk: Optional[Dict[str, float]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        if not (0 <= flag_threshold <= decline_threshold):
+            raise ValueError("Поріг позначення має бути не більшим за поріг відхилення.")
+        self.flag_threshold = flag_threshold
+        self.decline_threshold = decline_threshold
+        self.method_risk = dict(self.DEFAULT_METHOD_RISK if method_risk is None else method_risk)
+        self._blocklist = {item.lower() for item in blocklist}
+        # Ознаки зникають разом із рахунком, тож довгоживучий оцінювач не накопичує їх
+        self._features: "weakref.WeakKeyDictionary[PaymentStrategy, AccountFeatures]" = weakref.WeakKeyDictionary()
+        self._clock = clock
+
+    def block(self, identity: str):
+        """Додає email або адресу гаманця до чорного списку."""
+        self._blocklist.add(identity.lower())
+
+    def unblock(self, identity: str):
+        self._blocklist.discard(identity.lower())
+
+    @staticmethod
+    def _identity(strategy: PaymentStrategy) -> Optional[str]:
+        for attribute in ("email", "wallet_address", "card_number"):
+            value = getattr(strategy, attribute, None)
+            if isinstance(value, str):
+                return value.lower()
+        return None
+
+    def features(self, strategy: PaymentStrategy) -> AccountFeatures:
+        features = self._features.get(strategy)
+        if features is None:
+            features = AccountFeatures(
+                self._identity(strategy),
+                self.method_risk.get(strategy.__class__.__name__, 0.0)
+            )
+            self._features[strategy] = features
+        return features
+
+    def _score(self, features: AccountFeatures, amount: float, now: float) -> ScoreResult:
+        reasons = []
+        score = features.method_risk
+        if features.method_risk:
+            reasons.append("method")
+
+        if features.identity is not None and features.identity in self._blocklist:
+            score += 1.0
+            reasons.append("blocklist")
+
+        if features.count < self.MIN_HISTORY:
+            score += self.NEW_ACCOUNT_RISK
+            reasons.append("new_account")
+        else:
+            std = math.sqrt(features.m2 / (features.count - 1))
+            # Невелика нижня межа, щоб рахунок з однаковими сумами не давав z = нескінченність
+            z = (amount - features.mean) / max(std, features.mean * 0.05, 0.01)
+            if z > self.AMOUNT_Z_START:
+                share = min(1.0, (z - self.AMOUNT_Z_START) / (self.AMOUNT_Z_FULL - self.AMOUNT_Z_START))
+                score += self.AMOUNT_WEIGHT * share
+                reasons.append("amount")
+
+        if features.last_payment_at is not None:
+            elapsed = now - features.last_payment_at
+            if elapsed < self.VELOCITY_WINDOW:
+                score += self.VELOCITY_WEIGHT * (1.0 - max(0.0, elapsed) / self.VELOCITY_WINDOW)
+                reasons.append("velocity")
+
+        score = min(1.0, score)
+        if score >= self.decline_threshold:
+            decision = DECLINE
+        elif score >= self.flag_threshold:
+            decision = FLAG
+        else:
+            decision = APPROVE
+        return ScoreResult(score, decision, tuple(reasons))
+
+    def score(self, strategy: PaymentStrategy, amount: float, now: Optional[float] = None) -> ScoreResult:
+        return self._score(self.features(strategy), amount, self._clock() if now is None else now)
+
+    def score_batch(self, payments: Sequence[Tuple[PaymentStrategy, float]],
+                    now: Optional[float] = None) -> List[ScoreResult]:
+        """
+        Оцінює пакет платежів за один прохід: спільний час і один пошук ознак
+        на платіж. Ознаки не змінюються - усі платежі оцінюються відносно
+        стану рахунків до пакета.
+        """
+        now = self._clock() if now is None else now
+        features_of = self.features
+        score = self._score
+        return [score(features_of(strategy), amount, now) for strategy, amount in payments]
+
+    def observe(self, strategy: PaymentStrategy, amount: float, now: Optional[float] = None):
+        """Оновлює ознаки рахунку після успішного платежу."""
+        self.features(strategy).update(amount, self._clock() if now is None else now)
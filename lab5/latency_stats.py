@@ -0,0 +1,12 @@
+# latency_stats.py
+# Спільні допоміжні функції для звітів про затримки (load_client, workload).
+
+from typing import List
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Перцентиль (fraction від 0 до 1) вже відсортованого списку; 0.0 для порожнього."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
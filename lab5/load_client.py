@@ -0,0 +1,139 @@
+# load_client.py
+# Генератор навантаження для payment_service: кілька keep-alive з'єднань,
+# кожне надсилає запити конвеєром (pipeline) і вимірює затримку кожної відповіді.
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from latency_stats import percentile
+from payment_service import DEFAULT_HOST, DEFAULT_PORT
+
+
+def _encode_request(method: str, path: str, payload: Any = None) -> bytes:
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    head = (
+        f"{method} {path} HTTP/1.1\r\n"
+        f"Host: localhost\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def _read_response(reader: asyncio.StreamReader) -> Tuple[int, Any]:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        if line.lower().startswith("content-length:"):
+            length = int(line.split(":", 1)[1])
+    body = await reader.readexactly(length) if length else b""
+    return status, json.loads(body) if body else None
+
+
+async def request(host: str, port: int, method: str, path: str, payload: Any = None) -> Tuple[int, Any]:
+    """Одиночний запит через окреме з'єднання (для підготовки даних)."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(_encode_request(method, path, payload))
+        await writer.drain()
+        return await _read_response(reader)
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def _worker(host: str, port: int, request_bytes: bytes, count: int,
+                  pipeline: int, latencies: List[float], errors: List[int]):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        sent = 0
+        while sent < count:
+            depth = min(pipeline, count - sent)
+            started = time.perf_counter()
+            writer.write(request_bytes * depth)
+            await writer.drain()
+            for _ in range(depth):
+                status, _ = await _read_response(reader)
+                latencies.append(time.perf_counter() - started)
+                if status >= 400:
+                    errors.append(status)
+            sent += depth
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, requests: int = 10000,
+                   connections: int = 8, pipeline: int = 16, batch_size: int = 0) -> Dict[str, float]:
+    """
+    Створює рахунок з великим балансом і навантажує сервіс платежами.
+    При batch_size > 0 кожен HTTP запит - це /batch з batch_size платежів.
+    Повертає звіт: кількість операцій, пропускна здатність та перцентилі затримки.
+    """
+    status, created = await request(host, port, "POST", "/methods", {
+        "type": "card", "card_number": "4000000000000002", "expiry_date": "12/30",
+        "cvv": "123", "initial_balance": float(requests) * max(1, batch_size) * 10,
+    })
+    if status != 201:
+        raise RuntimeError(f"Не вдалося створити рахунок: {created}")
+    pay_op = {"method_id": created["id"], "amount": 1.0}
+    if batch_size > 0:
+        request_bytes = _encode_request("POST", "/batch", [dict(pay_op, op="pay")] * batch_size)
+    else:
+        request_bytes = _encode_request("POST", "/pay", pay_op)
+
+    latencies: List[float] = []
+    errors: List[int] = []
+    per_connection = [requests // connections + (1 if i < requests % connections else 0)
+                      for i in range(connections)]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(host, port, request_bytes, count, pipeline, latencies, errors)
+        for count in per_connection if count
+    ))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    operations = len(latencies) * max(1, batch_size)
+    return {
+        "requests": len(latencies),
+        "operations": operations,
+        "errors": len(errors),
+        "elapsed_s": elapsed,
+        "requests_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "operations_per_s": operations / elapsed if elapsed else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def print_report(report: Dict[str, float]):
+    print("--- Результати навантаження ---")
+    print(f"Запитів: {report['requests']} (операцій: {report['operations']}, помилок: {report['errors']})")
+    print(f"Час: {report['elapsed_s']:.2f} с")
+    print(f"Пропускна здатність: {report['requests_per_s']:.0f} запитів/с "
+          f"({report['operations_per_s']:.0f} операцій/с)")
+    print(f"Затримка p50: {report['p50_ms']:.2f} мс, p99: {report['p99_ms']:.2f} мс")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Генератор навантаження для payment_service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--connections", type=int, default=8)
+    parser.add_argument("--pipeline", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=0)
+    args = parser.parse_args(argv)
+    report = asyncio.run(run_load(args.host, args.port, args.requests,
+                                  args.connections, args.pipeline, args.batch_size))
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
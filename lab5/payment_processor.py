@@ -1,12 +1,99 @@
-from typing import Optional
+import math
+import threading
+import weakref
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from payment_strategies import PaymentStrategy
+from fraud_scoring import DECLINE, FLAG, FraudScorer, ScoreResult
+
+# Блокування рахунків, спільні для всіх процесорів
+_account_locks = weakref.WeakKeyDictionary()
+_account_locks_guard = threading.Lock()
+
+
+def _lock_for(strategy: PaymentStrategy) -> threading.Lock:
+    lock = _account_locks.get(strategy)
+    if lock is None:
+        with _account_locks_guard:
+            lock = _account_locks.get(strategy)
+            if lock is None:
+                lock = _account_locks[strategy] = threading.Lock()
+    return lock
+
+
+@contextmanager
+def _locked_accounts(strategies: Iterable[PaymentStrategy]):
+    """
+    Блокує всі рахунки операції в єдиному глобальному порядку (за id),
+    тож паралельні операції над тими ж рахунками не можуть взаємно заблокуватись.
+    Якщо рахунки підключено до сховища балансів, їх зміни фіксуються однією версією.
+    """
+    unique = sorted({id(strategy): strategy for strategy in strategies}.items())
+    with ExitStack() as stack:
+        for _, strategy in unique:
+            stack.enter_context(_lock_for(strategy))
+        stores = {id(store): store for store in
+                  (getattr(strategy, "_balance_store", None) for _, strategy in unique) if store is not None}
+        for _, store in sorted(stores.items()):
+            stack.enter_context(store.transaction())
+        yield
+
+
+def _apply_deltas(deltas: Dict[int, Tuple[PaymentStrategy, float]]):
+    """
+    Застосовує зміни балансів через adjust_balance (зовнішні рахунки - запитами
+    до постачальника). Списання йдуть першими, тож відмова постачальника в
+    списанні не залишає вже зарахованих коштів. При збої вже застосовані зміни
+    скасовуються зворотними.
+    """
+    applied: List[Tuple[PaymentStrategy, float]] = []
+    try:
+        for strategy, delta in sorted(deltas.values(), key=lambda item: item[1]):
+            strategy.adjust_balance(delta)
+            applied.append((strategy, delta))
+    except Exception:
+        for strategy, delta in reversed(applied):
+            try:
+                strategy.adjust_balance(-delta)
+            except Exception as e:
+                print(f"Error: failed to roll back ${delta:.2f} on {strategy.__class__.__name__}: {e}")
+        raise
+
+
+class PaymentRecord:
+    """Успішний платіж, який можна повністю або частково повернути."""
+    __slots__ = ("payment_id", "strategy", "amount", "refunded")
+
+    def __init__(self, payment_id: int, strategy: PaymentStrategy, amount: float):
+        self.payment_id = payment_id
+        self.strategy = strategy
+        self.amount = amount
+        self.refunded = 0.0
+
+    @property
+    def refundable(self) -> float:
+        return self.amount - self.refunded
+
 
 class PaymentProcessor:
     """
     Клас-контекст, який використовує обрану стратегію для обробки платежу.
     """
-    def __init__(self, strategy: Optional[PaymentStrategy] = None):
+    # Скільки останніх успішних платежів зберігати для повернень (0 - не зберігати)
+    DEFAULT_PAYMENT_HISTORY = 10000
+
+    def __init__(self, strategy: Optional[PaymentStrategy] = None, scorer: Optional[FraudScorer] = None,
+                 payment_history: int = DEFAULT_PAYMENT_HISTORY):
+        if payment_history < 0:
+            raise ValueError("Розмір історії платежів не може бути негативним.")
         self._strategy = strategy
+        self._scorer = scorer
+        self.last_score: Optional[ScoreResult] = None
+        self.last_payment_id: Optional[int] = None
+        self._payments: Dict[int, PaymentRecord] = {}
+        self._next_payment_id = 1
+        self._payments_lock = threading.Lock()
+        self._payment_history = payment_history
         if strategy:
             print(f"PaymentProcessor initialized with strategy: {strategy.__class__.__name__}")
         else:
@@ -18,17 +105,144 @@ class PaymentProcessor:
         print(f"Payment strategy set to: {strategy.__class__.__name__}")
 
 
-    def process_payment(self, amount: float) -> bool:
-        if not self._strategy:
+    def set_scorer(self, scorer: Optional[FraudScorer]):
+        """Вмикає (або вимикає, якщо None) оцінку ризику перед платежем."""
+        self._scorer = scorer
+
+
+    def process_payment(self, amount: float, strategy: Optional[PaymentStrategy] = None) -> bool:
+        """
+        strategy - рахунок саме для цього платежу замість встановленого через
+        set_strategy(); спільний стан процесора при цьому не змінюється, тож
+        так можна платити з кількох потоків одночасно.
+        """
+        strategy = strategy or self._strategy
+        if not strategy:
             print("Error: Payment strategy not set.")
             return False
         if amount <= 0:
             print("Error: Payment amount must be positive.")
             return False
 
+        if self._scorer:
+            self.last_score = self._scorer.score(strategy, amount)
+            if self.last_score.decision == DECLINE:
+                print(f"Payment declined by fraud scoring (score {self.last_score.score:.2f}: "
+                      f"{', '.join(self.last_score.reasons)}).")
+                return False
+            if self.last_score.decision == FLAG:
+                print(f"Warning: payment flagged by fraud scoring (score {self.last_score.score:.2f}).")
+
         print(f"PaymentProcessor attempting to process payment of ${amount:.2f}...")
         try:
-            return self._strategy.pay(amount)
+            with _locked_accounts([strategy]):
+                paid = strategy.pay(amount)
+            if paid:
+                self._record_payment(strategy, amount)
+                if self._scorer:
+                    self._scorer.observe(strategy, amount)
+            return paid
         except Exception as e:
-            print(f"Error during payment processing with {self._strategy.__class__.__name__}: {e}")
-            return False
\ No newline at end of file
+            print(f"Error during payment processing with {strategy.__class__.__name__}: {e}")
+            return False
+
+
+    def _record_payment(self, strategy: PaymentStrategy, amount: float):
+        with self._payments_lock:
+            payment_id = self._next_payment_id
+            self._next_payment_id += 1
+            if self._payment_history:
+                self._payments[payment_id] = PaymentRecord(payment_id, strategy, amount)
+                # Словник зберігає порядок вставки - найстаріший запис завжди перший
+                if len(self._payments) > self._payment_history:
+                    del self._payments[next(iter(self._payments))]
+        self.last_payment_id = payment_id
+
+
+    def add_funds(self, strategy: PaymentStrategy, amount: float) -> bool:
+        """
+        Поповнює рахунок під тим самим блокуванням, що й платежі та перекази,
+        тож паралельні операції над рахунком не втрачають оновлень.
+        """
+        if not math.isfinite(amount):
+            print("Error: Top-up amount must be a finite number.")
+            return False
+        try:
+            with _locked_accounts([strategy]):
+                return strategy.add_funds(amount)
+        except Exception as e:
+            print(f"Error during top-up with {strategy.__class__.__name__}: {e}")
+            return False
+
+
+    def get_payment(self, payment_id: int) -> Optional[PaymentRecord]:
+        return self._payments.get(payment_id)
+
+
+    def refund(self, payment_id: int, amount: Optional[float] = None) -> bool:
+        """
+        Повертає кошти за платежем на той самий рахунок. Без amount - повне
+        повернення залишку. Комісія крипто-платежу не повертається.
+        """
+        record = self._payments.get(payment_id)
+        if record is None:
+            print(f"Error: Payment {payment_id} not found.")
+            return False
+        if amount is not None and not (math.isfinite(amount) and amount > 0):
+            print("Error: Refund amount must be positive.")
+            return False
+
+        try:
+            with _locked_accounts([record.strategy]):
+                refund_amount = record.refundable if amount is None else amount
+                if refund_amount <= 0 or refund_amount > record.refundable + 1e-9:
+                    print(f"Error: Refund of ${refund_amount:.2f} exceeds refundable ${record.refundable:.2f} "
+                          f"for payment {payment_id}.")
+                    return False
+                _apply_deltas({id(record.strategy): (record.strategy, refund_amount)})
+                record.refunded += refund_amount
+        except Exception as e:
+            print(f"Error during refund of payment {payment_id}: {e}")
+            return False
+        print(f"Refunded ${refund_amount:.2f} for payment {payment_id}.")
+        return True
+
+
+    def transfer(self, source: PaymentStrategy, target: PaymentStrategy, amount: float) -> bool:
+        """Атомарно переказує кошти між двома збереженими методами (без комісій)."""
+        return self.transfer_batch([(source, target, amount)])
+
+
+    def transfer_batch(self, transfers: Sequence[Tuple[PaymentStrategy, PaymentStrategy, float]]) -> bool:
+        """
+        Застосовує пакет переказів за принципом "все або нічого".
+        Перекази сальдуються по рахунках за один прохід; пакет приймається,
+        якщо жоден рахунок не йде в мінус після застосування всіх переказів.
+        """
+        deltas: Dict[int, Tuple[PaymentStrategy, float]] = {}
+        for source, target, amount in transfers:
+            if not (math.isfinite(amount) and amount > 0):
+                print("Error: Transfer amount must be positive.")
+                return False
+            if source is target:
+                print("Error: Transfer source and target must differ.")
+                return False
+            for strategy, delta in ((source, -amount), (target, amount)):
+                current = deltas.get(id(strategy))
+                deltas[id(strategy)] = (strategy, (current[1] if current else 0.0) + delta)
+        if not deltas:
+            return True
+
+        try:
+            with _locked_accounts(strategy for strategy, _ in deltas.values()):
+                for strategy, delta in deltas.values():
+                    if strategy.balance + delta < 0:
+                        print(f"Error: Insufficient funds on {strategy.__class__.__name__} for transfer: "
+                              f"required ${-delta:.2f}, available ${strategy.balance:.2f}.")
+                        return False
+                _apply_deltas(deltas)
+        except Exception as e:
+            print(f"Error during transfer: {e}")
+            return False
+        print(f"Applied {len(transfers)} transfer(s) across {len(deltas)} account(s).")
+        return True
\ No newline at end of file
@@ -0,0 +1,370 @@
+# payment_service.py
+# Локальний HTTP/JSON сервіс поверх PaymentProcessor та платіжних стратегій.
+#
+# Ендпоінти:
+#   POST /methods        {"type": "<ключ постачальника>", ..., "initial_balance": 0.0}
+#   POST /pay            {"method_id": 1, "amount": 10.0}
+#   POST /topup          {"method_id": 1, "amount": 10.0}
+#   GET  /balance/<id>
+#   POST /batch          [{"op": "pay", "method_id": 1, "amount": 10.0}, ...]
+#
+# З'єднання keep-alive, запити в межах одного з'єднання можна надсилати конвеєром
+# (pipelining) - відповіді повертаються в тому ж порядку. Запити до методів
+# зовнішніх постачальників (блокуючі HTTP виклики) виконуються в пулі потоків,
+# тож повільний постачальник не зупиняє цикл подій і решту з'єднань.
+
+import argparse
+import asyncio
+import contextlib
+import functools
+import json
+import math
+import sys
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from payment_strategies import PaymentStrategy
+from payment_processor import PaymentProcessor
+from providers import ProviderError, get_provider, provider_for
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+MAX_BODY_SIZE = 1024 * 1024
+
+_REASONS = {
+    200: "OK",
+    201: "Created",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    502: "Bad Gateway",
+}
+
+
+_quiet_lock = threading.Lock()
+_quiet_depth = 0
+_saved_stdout = None
+
+
+@contextlib.contextmanager
+def _quiet_stdout():
+    """
+    Вимикає stdout (print при sys.stdout = None нічого не робить). Лічильник
+    вкладеності робить вимкнення безпечним для кількох потоків одночасно:
+    stdout відновлюється, коли з блоку виходить останній потік.
+    """
+    global _quiet_depth, _saved_stdout
+    with _quiet_lock:
+        if _quiet_depth == 0:
+            _saved_stdout, sys.stdout = sys.stdout, None
+        _quiet_depth += 1
+    try:
+        yield
+    finally:
+        with _quiet_lock:
+            _quiet_depth -= 1
+            if _quiet_depth == 0:
+                sys.stdout, _saved_stdout = _saved_stdout, None
+
+
+class ServiceError(Exception):
+    """Помилка запиту, яка повертається клієнту з відповідним HTTP статусом."""
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class PaymentService:
+    """
+    Стан сервісу: збережені платіжні методи та процесор.
+    Не залежить від транспорту, тому обробники можна викликати напряму.
+    """
+    def __init__(self, quiet: bool = True):
+        self.methods: Dict[int, PaymentStrategy] = {}
+        self.processor = PaymentProcessor()
+        self.quiet = quiet
+        self._next_id = 1
+        self._ids_lock = threading.Lock()  # add_method може виконуватись у пулі потоків
+
+    def close(self):
+        """Сервіс не тримає власних ресурсів; залишено для симетрії з serve()."""
+
+    def _output(self):
+        # Стратегії друкують кожну операцію; під навантаженням це найдорожча частина запиту
+        return _quiet_stdout() if self.quiet else contextlib.nullcontext()
+
+    def _get_method(self, method_id: Any) -> PaymentStrategy:
+        try:
+            return self.methods[int(method_id)]
+        except (KeyError, TypeError, ValueError):
+            raise ServiceError(404, f"Платіжний метод {method_id} не знайдено.")
+
+    @staticmethod
+    def _get_number(payload: Dict[str, Any], field: str, default: Optional[float] = None) -> float:
+        """Читає скінченне число з тіла запиту (NaN та нескінченність відхиляються)."""
+        try:
+            value = float(payload[field] if default is None else payload.get(field, default))
+        except (KeyError, TypeError, ValueError):
+            raise ServiceError(400, f"Поле {field} має бути числом.")
+        if not math.isfinite(value):
+            raise ServiceError(400, f"Поле {field} має бути скінченним числом.")
+        return value
+
+    def _get_amount(self, payload: Dict[str, Any]) -> float:
+        return self._get_number(payload, "amount")
+
+    def _create_strategy(self, payload: Dict[str, Any]) -> PaymentStrategy:
+        method_type = payload.get("type")
+        provider = get_provider(method_type) if isinstance(method_type, str) else None
+        if provider is None:
+            raise ServiceError(400, f"Невідомий тип платіжного методу: {method_type}")
+        initial_balance = self._get_number(payload, "initial_balance", default=0.0)
+        return provider.create_strategy(payload, initial_balance)
+
+    def add_method(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            with self._output():
+                strategy = self._create_strategy(payload)
+        except (TypeError, ValueError) as e:
+            raise ServiceError(400, str(e))
+        except ProviderError as e:
+            raise ServiceError(502, str(e))
+        with self._ids_lock:
+            method_id = self._next_id
+            self._next_id += 1
+            self.methods[method_id] = strategy
+        return {"id": method_id, "balance": strategy.balance}
+
+    def pay(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        strategy = self._get_method(payload.get("method_id"))
+        amount = self._get_amount(payload)
+        with self._output():
+            ok = self.processor.process_payment(amount, strategy)
+        return {"ok": ok, "balance": strategy.balance}
+
+    def top_up(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        strategy = self._get_method(payload.get("method_id"))
+        amount = self._get_amount(payload)
+        with self._output():
+            ok = self.processor.add_funds(strategy, amount)
+        return {"ok": ok, "balance": strategy.balance}
+
+    def balance(self, method_id: Any) -> Dict[str, Any]:
+        strategy = self._get_method(method_id)
+        return {"id": int(method_id), "balance": strategy.balance}
+
+    def batch(self, ops: Any) -> List[Dict[str, Any]]:
+        """
+        Виконує список операцій за один запит. Помилка однієї операції
+        не перериває інші - вона повертається на своїй позиції у відповіді.
+        """
+        if not isinstance(ops, list):
+            raise ServiceError(400, "Тіло /batch має бути JSON масивом.")
+        handlers = {
+            "add_method": self.add_method,
+            "pay": self.pay,
+            "topup": self.top_up,
+            "balance": lambda op: self.balance(op.get("method_id")),
+        }
+        results = []
+        for op in ops:
+            handler = handlers.get(op.get("op")) if isinstance(op, dict) else None
+            if handler is None:
+                results.append({"status": 400, "error": f"Невідома операція: {op}"})
+                continue
+            try:
+                results.append({"status": 200, "result": handler(op)})
+            except ServiceError as e:
+                results.append({"status": e.status, "error": str(e)})
+            except Exception as e:
+                # Попередні операції пакета вже застосовані - збій однієї не скасовує відповідь
+                results.append({"status": 500, "error": f"Невідома помилка: {e}"})
+        return results
+
+    def _uses_remote_provider(self, path: str, payload: Any) -> bool:
+        """Чи звертається запит до постачальника з пулом з'єднань (блокуючі виклики)."""
+        ops = payload if path == "/batch" else [payload]
+        for op in ops if isinstance(ops, list) else ():
+            if not isinstance(op, dict):
+                continue
+            if path == "/methods" or op.get("op") == "add_method":
+                method_type = op.get("type")
+                provider = get_provider(method_type) if isinstance(method_type, str) else None
+            else:
+                try:
+                    strategy = self.methods.get(int(op.get("method_id")))
+                except (TypeError, ValueError, OverflowError):
+                    strategy = None
+                provider = provider_for(strategy) if strategy is not None else None
+            if provider is not None and provider.pool is not None:
+                return True
+        return False
+
+    def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Callable[[], Any], bool]:
+        """Повертає (статус, обробник без аргументів, чи потрібен окремий потік)."""
+        if path.startswith("/balance/"):
+            if method != "GET":
+                raise ServiceError(405, "Дозволено лише GET.")
+            return 200, functools.partial(self.balance, path[len("/balance/"):]), False
+
+        routes = {
+            "/methods": (201, self.add_method),
+            "/pay": (200, self.pay),
+            "/topup": (200, self.top_up),
+            "/batch": (200, self.batch),
+        }
+        if path not in routes:
+            raise ServiceError(404, f"Невідомий шлях: {path}")
+        if method != "POST":
+            raise ServiceError(405, "Дозволено лише POST.")
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            raise ServiceError(400, "Некоректний JSON.")
+        if path != "/batch" and not isinstance(payload, dict):
+            raise ServiceError(400, "Тіло запиту має бути JSON об'єктом.")
+        status, handler = routes[path]
+        return status, functools.partial(handler, payload), self._uses_remote_provider(path, payload)
+
+    @staticmethod
+    def _respond(status: int, call: Callable[[], Any]) -> Tuple[int, Any]:
+        try:
+            return status, call()
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"Невідома помилка: {e}"}
+
+    def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Маршрутизує запит та повертає (статус, JSON-сумісна відповідь)."""
+        try:
+            status, call, _ = self._route(method, path, body)
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"Невідома помилка: {e}"}
+        return self._respond(status, call)
+
+    async def dispatch_async(self, method: str, path: str, body: bytes) -> Tuple[int, Any]:
+        """Як dispatch, але запити до зовнішніх постачальників виконує поза циклом подій."""
+        try:
+            status, call, remote = self._route(method, path, body)
+        except ServiceError as e:
+            return e.status, {"error": str(e)}
+        except Exception as e:
+            return 500, {"error": f"Невідома помилка: {e}"}
+        if remote:
+            return await asyncio.to_thread(self._respond, status, call)
+        return self._respond(status, call)
+
+
+def _build_response(status: int, payload: Any, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    head = (
+        f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+        f"Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str], bytes]]:
+    """Читає один HTTP запит. Повертає None, якщо клієнт закрив з'єднання."""
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ", 2)
+    except ValueError:
+        raise ServiceError(400, "Некоректний рядок запиту.")
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", "0"))
+    except ValueError:
+        raise ServiceError(400, "Некоректний Content-Length.")
+    if length < 0:
+        raise ServiceError(400, "Некоректний Content-Length.")
+    if length > MAX_BODY_SIZE:
+        raise ServiceError(413, "Тіло запиту завелике.")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, version, headers, body
+
+
+def _wants_keep_alive(version: str, headers: Dict[str, str]) -> bool:
+    connection = headers.get("connection", "").lower()
+    if version == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+async def _handle_connection(service: PaymentService, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter):
+    try:
+        while True:
+            try:
+                request = await _read_request(reader)
+            except ServiceError as e:
+                writer.write(_build_response(e.status, {"error": str(e)}, keep_alive=False))
+                break
+            if request is None:
+                break
+            method, target, version, headers, body = request
+            keep_alive = _wants_keep_alive(version, headers)
+            status, payload = await service.dispatch_async(method, target.split("?", 1)[0], body)
+            writer.write(_build_response(status, payload, keep_alive))
+            # Поки в буфері є наступні конвеєрні запити, відповіді лише накопичуються;
+            # drain() чекає тільки при переповненні буфера запису.
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+        with contextlib.suppress(Exception):
+            await writer.wait_closed()
+
+
+async def start_server(service: PaymentService, host: str = DEFAULT_HOST,
+                       port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+    """Запускає сервер у поточному циклі подій (port=0 - вільний порт)."""
+    return await asyncio.start_server(
+        lambda r, w: _handle_connection(service, r, w), host, port
+    )
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, quiet: bool = True):
+    service = PaymentService(quiet=quiet)
+    server = await start_server(service, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Платіжний сервіс слухає на http://{address[0]}:{address[1]}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Локальний HTTP/JSON платіжний сервіс.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--verbose", action="store_true", help="Не приховувати вивід стратегій.")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, quiet=not args.verbose))
+    except KeyboardInterrupt:
+        print("Сервіс зупинено.")
+
+
+if __name__ == "__main__":
+    main()
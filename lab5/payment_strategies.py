@@ -4,6 +4,27 @@ from typing import Optional
 
 
 class PaymentStrategy(ABC):
+    # Сховище балансів (balance_store.BalanceStore), до якого підключено рахунок
+    _balance_store = None
+    _balance_account_id: Optional[int] = None
+
+    @property
+    def balance(self) -> float:
+        return self._balance
+
+    @balance.setter
+    def balance(self, value: float):
+        self._balance = value
+        if self._balance_store is not None:
+            self._balance_store.record(self._balance_account_id, value)
+
+    def adjust_balance(self, delta: float):
+        """
+        Змінює баланс на delta без перевірок і комісій (перекази, повернення).
+        Рахунки, баланс яких веде зовнішній постачальник, перевизначають цей метод.
+        """
+        self.balance = self.balance + delta
+
     @abstractmethod
     def pay(self, amount: float) -> bool:
         pass
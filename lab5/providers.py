@@ -0,0 +1,321 @@
+# providers.py
+# Реєстр платіжних постачальників.
+#
+# Постачальник описує все, що потрібно решті програми про тип платіжного методу:
+# клас стратегії, поля для його створення, форматування в списку методів та
+# (для зовнішніх постачальників) спільний обмежений пул з'єднань. Новий тип
+# методу додається викликом register_provider() без змін у консолі чи сервісі.
+
+import http.client
+import json
+import queue
+import select
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Type
+
+from payment_strategies import (
+    CreditCardPaymentStrategy,
+    PayPalPaymentStrategy,
+    CryptoPaymentStrategy,
+    PaymentStrategy
+)
+
+
+class ProviderError(Exception):
+    """Помилка зв'язку із зовнішнім постачальником."""
+
+
+def _is_stale(conn: http.client.HTTPConnection) -> bool:
+    """
+    Чи закрив сервер простоюче з'єднання. У простої з'єднання немає чого
+    читати, тож готовність сокета до читання означає EOF (або сміття).
+    """
+    if conn.sock is None:
+        return False
+    try:
+        readable, _, _ = select.select([conn.sock], [], [], 0)
+    except (OSError, TypeError, ValueError):  # сокет уже закрито або він недійсний
+        return True
+    return bool(readable)
+
+
+class ConnectionPool:
+    """
+    Обмежений пул keep-alive HTTP з'єднань до постачальника.
+    З'єднання відкриваються на вимогу (не більше max_size) і повторно
+    використовуються, тож платіж не встановлює нове з'єднання.
+    З'єднання, які сервер закрив під час простою, перевідкриваються перед
+    запитом; якщо сервер закрив з'єднання вже під час запиту, запит один раз
+    повторюється (див. Idempotency-Key у RemotePaymentStrategy).
+    """
+    def __init__(self, host: str, port: int, max_size: int = 4, timeout: float = 5.0,
+                 factory: Optional[Callable[[], http.client.HTTPConnection]] = None):
+        if max_size <= 0:
+            raise ValueError("Розмір пулу з'єднань має бути позитивним.")
+        self.host = host
+        self.port = port
+        self.max_size = max_size
+        self.timeout = timeout
+        self._factory = factory or (lambda: http.client.HTTPConnection(host, port, timeout=timeout))
+        self._idle: "queue.LifoQueue[http.client.HTTPConnection]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._closed = False
+
+    @property
+    def created(self) -> int:
+        """Скільки з'єднань відкрито за весь час роботи пулу."""
+        return self._created
+
+    def _acquire(self) -> http.client.HTTPConnection:
+        if self._closed:
+            raise ProviderError("Пул з'єднань закрито.")
+        try:
+            return self._checked(self._idle.get_nowait())
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.max_size:
+                self._created += 1
+                return self._factory()
+        try:
+            return self._checked(self._idle.get(timeout=self.timeout))
+        except queue.Empty:
+            raise ProviderError(f"Немає вільних з'єднань до {self.host}:{self.port}.")
+
+    @staticmethod
+    def _checked(conn: http.client.HTTPConnection) -> http.client.HTTPConnection:
+        if _is_stale(conn):
+            conn.close()  # HTTPConnection відкриє новий сокет при наступному запиті
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[http.client.HTTPConnection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        except Exception:
+            # Стан з'єднання після збою невідомий - закриваємо і звільняємо місце в пулі
+            conn.close()
+            with self._lock:
+                self._created -= 1
+            raise
+        if self._closed:
+            conn.close()  # Пул закрили, поки з'єднання було видане
+        else:
+            self._idle.put(conn)
+
+    def request_json(self, method: str, path: str, payload: Any = None,
+                     headers: Optional[Dict[str, str]] = None) -> Tuple[int, Any]:
+        """
+        Виконує JSON запит через з'єднання з пулу. Якщо перевикористане
+        з'єднання виявилось закритим сервером до відповіді, запит один раз
+        повторюється на новому з'єднанні з тими самими заголовками.
+        """
+        body = json.dumps(payload) if payload is not None else None
+        headers = dict(headers or {})
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            reused = False
+            try:
+                with self.connection() as conn:
+                    reused = conn.sock is not None
+                    conn.request(method, path, body=body, headers=headers)
+                    response = conn.getresponse()
+                    data = response.read()
+                break
+            except (ConnectionResetError, BrokenPipeError) as e:  # в т.ч. http.client.RemoteDisconnected
+                if attempt or not reused:
+                    raise ProviderError(f"Помилка зв'язку з постачальником: {e}")
+            except (OSError, http.client.HTTPException) as e:
+                raise ProviderError(f"Помилка зв'язку з постачальником: {e}")
+        try:
+            return response.status, json.loads(data) if data else None
+        except ValueError as e:
+            raise ProviderError(f"Постачальник повернув некоректну відповідь (HTTP {response.status}): {e}")
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class PaymentProvider:
+    """Опис типу платіжного методу в реєстрі."""
+    def __init__(self, key: str, title: str, strategy_class: Type[PaymentStrategy],
+                 fields: Sequence[Tuple[str, str]], formatter: Callable[[PaymentStrategy], str],
+                 pool: Optional[ConnectionPool] = None, supports_add_funds: bool = True,
+                 amount_prompt: str = "Введіть суму платежу: ",
+                 strategy_kwargs: Optional[Dict[str, Any]] = None):
+        self.key = key
+        self.title = title
+        self.strategy_class = strategy_class
+        self.fields = tuple(fields)  # (ім'я аргументу конструктора, підказка для введення)
+        self.formatter = formatter
+        self.pool = pool
+        self.supports_add_funds = supports_add_funds
+        self.amount_prompt = amount_prompt
+        self.strategy_kwargs = dict(strategy_kwargs or {})
+
+    @property
+    def field_names(self) -> Tuple[str, ...]:
+        return tuple(name for name, _ in self.fields)
+
+    def create_strategy(self, values: Dict[str, Any], initial_balance: float = 0.0) -> PaymentStrategy:
+        kwargs = {name: values.get(name, "") for name in self.field_names}
+        kwargs.update(self.strategy_kwargs)
+        return self.strategy_class(initial_balance=initial_balance, **kwargs)
+
+    def describe(self, strategy: PaymentStrategy) -> str:
+        return self.formatter(strategy)
+
+
+_providers: Dict[str, PaymentProvider] = {}
+_providers_by_class: Dict[type, PaymentProvider] = {}
+
+
+def register_provider(provider: PaymentProvider, replace: bool = False) -> PaymentProvider:
+    if provider.key in _providers and not replace:
+        raise ValueError(f"Постачальник '{provider.key}' вже зареєстрований.")
+    old = _providers.get(provider.key)
+    if old is not None:
+        _providers_by_class.pop(old.strategy_class, None)
+        if old.pool is not None and old.pool is not provider.pool:
+            old.pool.close()
+    _providers[provider.key] = provider
+    _providers_by_class[provider.strategy_class] = provider
+    return provider
+
+
+def unregister_provider(key: str) -> Optional[PaymentProvider]:
+    provider = _providers.pop(key, None)
+    if provider is not None:
+        _providers_by_class.pop(provider.strategy_class, None)
+        if provider.pool is not None:
+            provider.pool.close()
+    return provider
+
+
+def get_provider(key: str) -> Optional[PaymentProvider]:
+    return _providers.get(key)
+
+
+def list_providers() -> List[PaymentProvider]:
+    """Постачальники в порядку реєстрації."""
+    return list(_providers.values())
+
+
+def provider_for(strategy: PaymentStrategy) -> Optional[PaymentProvider]:
+    """Постачальник стратегії (з урахуванням підкласів зареєстрованих стратегій)."""
+    for cls in type(strategy).__mro__:
+        provider = _providers_by_class.get(cls)
+        if provider is not None:
+            return provider
+    return None
+
+
+class RemotePaymentStrategy(PaymentStrategy):
+    """
+    Рахунок у зовнішнього постачальника. Баланс веде постачальник; локальне
+    значення оновлюється з кожної його відповіді. Запити йдуть через пул
+    з'єднань зареєстрованого постачальника provider_key; кожна операція має
+    власний Idempotency-Key, тож повторений пулом запит не списує двічі.
+    """
+    def __init__(self, account_id: str, initial_balance: float = 0.0, provider_key: str = "remote"):
+        if not account_id:
+            raise ValueError("Ідентифікатор рахунку постачальника має бути наданий.")
+        if initial_balance < 0:
+            raise ValueError("Початковий баланс не може бути негативним.")
+        self.account_id = account_id
+        self.provider_key = provider_key
+        status, data = self._request("/accounts", {"account": account_id, "balance": initial_balance})
+        if status != 201:
+            raise ValueError(f"Постачальник відхилив рахунок {account_id}: {data}")
+        self.balance = data["balance"]
+        print(f"RemotePaymentStrategy ініціалізовано для рахунку {account_id} ({provider_key}). "
+              f"Баланс: ${self.balance:.2f}")
+
+    def _request(self, path: str, payload: Dict[str, Any]) -> Tuple[int, Any]:
+        provider = get_provider(self.provider_key)
+        if provider is None or provider.pool is None:
+            raise ProviderError(f"Постачальник '{self.provider_key}' не зареєстрований або не має пулу з'єднань.")
+        return provider.pool.request_json("POST", path, payload, headers={"Idempotency-Key": uuid.uuid4().hex})
+
+    def _operation(self, path: str, amount: float) -> bool:
+        status, data = self._request(path, {"account": self.account_id, "amount": amount})
+        if data and "balance" in data:
+            self.balance = data["balance"]
+        return status == 200 and bool(data and data.get("ok"))
+
+    def adjust_balance(self, delta: float):
+        """Перекази та повернення теж проходять через постачальника."""
+        if delta == 0:
+            return
+        if not self._operation("/credit" if delta > 0 else "/charge", abs(delta)):
+            raise ProviderError(f"Постачальник відхилив зміну балансу рахунку {self.account_id} "
+                                f"на ${delta:.2f} (баланс: ${self.balance:.2f}).")
+
+    def add_funds(self, amount: float) -> bool:
+        if amount <= 0:
+            print("Сума поповнення має бути позитивною.")
+            return False
+        ok = self._operation("/credit", amount)
+        if ok:
+            print(f"Рахунок {self.account_id} поповнено на ${amount:.2f}. Новий баланс: ${self.balance:.2f}")
+        return ok
+
+    def pay(self, amount: float) -> bool:
+        if amount <= 0:
+            print("Сума платежу має бути позитивною.")
+            return False
+        ok = self._operation("/charge", amount)
+        if ok:
+            print(f"Списання ${amount:.2f} з рахунку {self.account_id} успішне. Новий баланс: ${self.balance:.2f}")
+        else:
+            print(f"Постачальник відхилив списання ${amount:.2f} з рахунку {self.account_id} "
+                  f"(баланс: ${self.balance:.2f}).")
+        return ok
+
+    def get_balance_info(self) -> Optional[str]:
+        return f"Баланс: ${self.balance:.2f}"
+
+
+def register_remote_provider(key: str, title: str, host: str, port: int, pool_size: int = 4,
+                             timeout: float = 5.0) -> PaymentProvider:
+    """Реєструє зовнішнього постачальника з власним пулом з'єднань."""
+    strategy_class = type(f"{key.capitalize()}RemotePaymentStrategy", (RemotePaymentStrategy,), {})
+    return register_provider(PaymentProvider(
+        key, title, strategy_class,
+        fields=(("account_id", "Введіть ідентифікатор рахунку: "),),
+        formatter=lambda strategy: f"{title}: {strategy.account_id}",
+        pool=ConnectionPool(host, port, max_size=pool_size, timeout=timeout),
+        strategy_kwargs={"provider_key": key},
+    ))
+
+
+register_provider(PaymentProvider(
+    "card", "Кредитна картка", CreditCardPaymentStrategy,
+    fields=(
+        ("card_number", "Введіть номер картки: "),
+        ("expiry_date", "Введіть термін дії (ММ/РР): "),
+        ("cvv", "Введіть CVV/CVC: "),
+    ),
+    formatter=lambda strategy: f"Картка ...{strategy.card_number[-4:]}",
+))
+register_provider(PaymentProvider(
+    "paypal", "PayPal", PayPalPaymentStrategy,
+    fields=(("email", "Введіть email для PayPal: "),),
+    formatter=lambda strategy: f"PayPal: {strategy.email}",
+))
+register_provider(PaymentProvider(
+    "crypto", "Криптовалютний гаманець", CryptoPaymentStrategy,
+    fields=(("wallet_address", "Введіть адресу криптовалютного гаманця: "),),
+    formatter=lambda strategy: f"Гаманець: {strategy.wallet_address[:6]}...",
+    amount_prompt="Введіть суму, яку має отримати отримувач (комісія буде додана): ",
+))
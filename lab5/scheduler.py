@@ -0,0 +1,202 @@
+# scheduler.py
+# Регулярні (підписочні) платежі поверх PaymentProcessor.
+#
+# Розклади зберігаються в бінарній купі за часом наступного запуску: пошук
+# найближчого платежу - O(1), вибірка k прострочених - O(k log n). Скасовані
+# розклади видаляються з купи ліниво, коли доходять до її вершини.
+#
+# Невдале списання не зсуває next_run: пропущені запуски залишаються борговими,
+# а розклад повторюється через retry_delay (але не пізніше за один інтервал).
+# Якщо сумарне списання пропущених запусків не проходить, запуски списуються
+# по одному, доки вистачає коштів. Після max_failures невдач поспіль розклад
+# призупиняється до виклику resume().
+
+import heapq
+import math
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from payment_strategies import PaymentStrategy
+from payment_processor import PaymentProcessor
+
+CATCH_UP_BULK = "bulk"  # Пропущені запуски списуються одним платежем на суму всіх запусків
+CATCH_UP_SKIP = "skip"  # Пропущені запуски відкидаються, списується лише один
+
+
+class RecurringPayment:
+    """Розклад регулярного платежу."""
+    __slots__ = ("schedule_id", "strategy", "amount", "interval", "next_run",
+                 "remaining", "active", "failures", "retry_at", "suspended")
+
+    def __init__(self, schedule_id: int, strategy: PaymentStrategy, amount: float,
+                 interval: float, next_run: float, remaining: Optional[int]):
+        self.schedule_id = schedule_id
+        self.strategy = strategy
+        self.amount = amount
+        self.interval = interval
+        self.next_run = next_run
+        self.remaining = remaining  # None - безстроковий розклад
+        self.active = True
+        self.failures = 0  # Невдалих спроб поспіль
+        self.retry_at = next_run  # Час наступної спроби (ключ у купі); після збою - пізніше за next_run
+        self.suspended = False
+
+
+class ScheduledRun(NamedTuple):
+    schedule_id: int
+    runs: int          # Скільки запусків покрито цим платежем
+    amount: float      # Сума, передана процесору
+    ok: bool
+
+
+class PaymentScheduler:
+    def __init__(self, processor: Optional[PaymentProcessor] = None,
+                 clock: Callable[[], float] = time.time, catch_up: str = CATCH_UP_BULK,
+                 retry_delay: float = 60.0, max_failures: Optional[int] = 5):
+        if catch_up not in (CATCH_UP_BULK, CATCH_UP_SKIP):
+            raise ValueError(f"Невідомий режим надолуження: {catch_up}")
+        if not (math.isfinite(retry_delay) and retry_delay > 0):
+            raise ValueError("Затримка повторної спроби має бути позитивною.")
+        if max_failures is not None and max_failures <= 0:
+            raise ValueError("Кількість невдач до призупинення має бути позитивною.")
+        self.processor = processor or PaymentProcessor()
+        self.catch_up = catch_up
+        self.retry_delay = retry_delay
+        self.max_failures = max_failures  # None - не призупиняти
+        self._clock = clock
+        self._heap: List[Tuple[float, int]] = []
+        self._schedules: Dict[int, RecurringPayment] = {}
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._schedules)
+
+    def schedule(self, strategy: PaymentStrategy, amount: float, interval: float,
+                 start_at: Optional[float] = None, runs: Optional[int] = None) -> int:
+        """
+        Додає регулярний платіж: amount кожні interval секунд, починаючи з start_at
+        (за замовчуванням - зараз). runs обмежує кількість запусків.
+        """
+        if not (math.isfinite(amount) and amount > 0):
+            raise ValueError("Сума регулярного платежу має бути позитивною.")
+        if not (math.isfinite(interval) and interval > 0):
+            raise ValueError("Інтервал регулярного платежу має бути позитивним.")
+        if runs is not None and runs <= 0:
+            raise ValueError("Кількість запусків має бути позитивною.")
+        next_run = self._clock() if start_at is None else start_at
+        if not math.isfinite(next_run):
+            raise ValueError("Час першого запуску має бути скінченним числом.")
+        schedule_id = self._next_id
+        self._next_id += 1
+        self._schedules[schedule_id] = RecurringPayment(schedule_id, strategy, amount, interval, next_run, runs)
+        heapq.heappush(self._heap, (next_run, schedule_id))
+        return schedule_id
+
+    def get(self, schedule_id: int) -> Optional[RecurringPayment]:
+        return self._schedules.get(schedule_id)
+
+    def cancel(self, schedule_id: int) -> bool:
+        recurring = self._schedules.pop(schedule_id, None)
+        if recurring is None:
+            return False
+        recurring.active = False
+        return True
+
+    def resume(self, schedule_id: int, at: Optional[float] = None) -> bool:
+        """Відновлює призупинений розклад; борг за пропущені запуски зберігається."""
+        recurring = self._schedules.get(schedule_id)
+        if recurring is None or not recurring.suspended:
+            return False
+        recurring.suspended = False
+        recurring.failures = 0
+        self._push(recurring, self._clock() if at is None else at)
+        return True
+
+    def _push(self, recurring: RecurringPayment, at: float):
+        recurring.retry_at = at
+        heapq.heappush(self._heap, (at, recurring.schedule_id))
+
+    def _drop_stale(self):
+        heap = self._heap
+        while heap:
+            next_run, schedule_id = heap[0]
+            recurring = self._schedules.get(schedule_id)
+            if recurring is not None and recurring.retry_at == next_run:
+                return
+            heapq.heappop(heap)
+
+    def next_due(self) -> Optional[float]:
+        """Час найближчого запуску або None, якщо розкладів немає."""
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _pop_due(self, now: float, limit: Optional[int]) -> List[RecurringPayment]:
+        due = []
+        heap = self._heap
+        while heap and heap[0][0] <= now and (limit is None or len(due) < limit):
+            next_run, schedule_id = heapq.heappop(heap)
+            recurring = self._schedules.get(schedule_id)
+            if recurring is not None and recurring.retry_at == next_run:
+                due.append(recurring)
+        return due
+
+    def _charge(self, recurring: RecurringPayment, runs: int) -> Tuple[int, float, bool]:
+        """
+        Списує runs запусків одним платежем; якщо не вдалося - по одному, доки
+        проходять. Повертає (списаних запусків, сума, ok) для ScheduledRun.
+        """
+        self.processor.set_strategy(recurring.strategy)
+        amount = recurring.amount * runs
+        if self.processor.process_payment(amount):
+            return runs, amount, True
+        paid = 0
+        while runs > 1 and paid < runs and self.processor.process_payment(recurring.amount):
+            paid += 1
+        if paid:
+            return paid, recurring.amount * paid, True
+        return runs, amount, False
+
+    def run_due(self, now: Optional[float] = None, limit: Optional[int] = None) -> List[ScheduledRun]:
+        """
+        Виконує всі прострочені на момент now розклади одним пакетом.
+        Якщо з часу next_run минуло кілька інтервалів (наприклад, після простою),
+        вони надолужуються одним платежем (CATCH_UP_BULK) або відкидаються (CATCH_UP_SKIP).
+        Після невдалого списання розклад лишається простроченим і повторюється
+        через min(retry_delay, interval); жоден запуск при цьому не втрачається.
+        Виняток під час списання вважається невдачею і не виводить розклад з купи.
+        """
+        now = self._clock() if now is None else now
+        due = self._pop_due(now, limit)
+        results = []
+        for recurring in due:
+            retry_at = now + min(self.retry_delay, recurring.interval)
+            missed = int(math.floor((now - recurring.next_run) / recurring.interval)) + 1
+            if recurring.remaining is not None:
+                missed = min(missed, recurring.remaining)
+            bulk = self.catch_up == CATCH_UP_BULK
+            try:
+                charged_runs, amount, ok = self._charge(recurring, missed if bulk else 1)
+            except Exception as e:
+                print(f"Error during scheduled payment {recurring.schedule_id}: {e}")
+                charged_runs, amount, ok = (missed if bulk else 1), 0.0, False
+            results.append(ScheduledRun(recurring.schedule_id, charged_runs, amount, ok))
+
+            if not ok:
+                recurring.failures += 1
+                if self.max_failures is not None and recurring.failures >= self.max_failures:
+                    recurring.suspended = True  # Не в купі, доки не буде resume()
+                    continue
+                self._push(recurring, retry_at)
+                continue
+
+            recurring.failures = 0
+            covered = charged_runs if bulk else missed
+            recurring.next_run += covered * recurring.interval
+            if recurring.remaining is not None:
+                recurring.remaining -= covered
+                if recurring.remaining == 0:
+                    self.cancel(recurring.schedule_id)
+                    continue
+            # Списано лише частину боргу - решта повторюється як після невдачі
+            self._push(recurring, recurring.next_run if recurring.next_run > now else retry_at)
+        return results
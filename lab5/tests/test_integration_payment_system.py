@@ -5,6 +5,18 @@ from payment_strategies import (
     CryptoPaymentStrategy
 )
 from payment_processor import PaymentProcessor
+import asyncio
+import contextlib
+import time
+import threading
+from balance_store import BalanceStore
+from fraud_scoring import FraudScorer
+import workload
+from scheduler import PaymentScheduler
+import providers
+from fake_provider_server import start_fake_provider
+from payment_service import PaymentService, start_server
+from load_client import _read_response, request, run_load
 
 VALID_CRYPTO_ADDRESS_INTEG = "bc1qj8nferns9wf35s208vwedywudvxm76n2z8j9l3"
 
@@ -121,3 +133,350 @@ def test_integ_cc_payment_insufficient_funds():
     assert processor.process_payment(100.0) is False # Очікуємо False
     assert cc_strategy.balance == 50.0 # Баланс не має змінитися
 
+#  PaymentService + load_client
+
+def test_integ_service_keep_alive_pipelining_and_load():
+    async def scenario():
+        service = PaymentService()
+        server = await start_server(service, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            status, created = await request("127.0.0.1", port, "POST", "/methods",
+                                            {"type": "crypto", "wallet_address": VALID_CRYPTO_ADDRESS_INTEG,
+                                             "initial_balance": 50.0})
+            assert status == 201
+            status, info = await request("127.0.0.1", port, "GET", f"/balance/{created['id']}")
+            assert (status, info["balance"]) == (200, 50.0)
+
+            report = await run_load("127.0.0.1", port, requests=200, connections=4, pipeline=8)
+            batch_report = await run_load("127.0.0.1", port, requests=20, connections=2, pipeline=4, batch_size=10)
+        finally:
+            server.close()
+            await server.wait_closed()
+            service.close()
+        return report, batch_report
+
+    report, batch_report = asyncio.run(scenario())
+    assert report["requests"] == 200 and report["errors"] == 0
+    assert report["p99_ms"] >= report["p50_ms"] > 0
+    assert batch_report["operations"] == 200 and batch_report["errors"] == 0
+
+def test_integ_service_rejects_negative_content_length():
+    async def scenario():
+        server = await start_server(PaymentService(), "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b"POST /pay HTTP/1.1\r\nHost: localhost\r\nContent-Length: -5\r\n\r\n")
+            await writer.drain()
+            response = await _read_response(reader)
+            writer.close()
+            await writer.wait_closed()
+            return response
+        finally:
+            server.close()
+            await server.wait_closed()
+
+    status, body = asyncio.run(scenario())
+    assert status == 400 and "Content-Length" in body["error"]
+
+#  BalanceStore + паралельні платежі
+
+def test_integ_snapshots_consistent_during_concurrent_writes():
+    store = BalanceStore(gc_interval=64)
+    accounts = [CreditCardPaymentStrategy(f"55550000{i:08d}", "12/30", "123", initial_balance=100.0)
+                for i in range(4)]
+    for account in accounts:
+        store.register(account)
+    expected_total = 400.0
+    stop = threading.Event()
+
+    def writer():
+        i = 0
+        while not stop.is_set():
+            source, target = accounts[i % 4], accounts[(i + 1) % 4]
+            with store.transaction():
+                source.balance -= 1.0
+                target.balance += 1.0
+            i += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    try:
+        for _ in range(500):
+            with store.snapshot() as snapshot:
+                assert snapshot.total() == pytest.approx(expected_total)
+    finally:
+        stop.set()
+        thread.join()
+    with store.snapshot() as snapshot:
+        assert [snapshot[i] for i in range(1, 5)] == [a.balance for a in accounts]
+
+#  PaymentProcessor + FraudScorer
+
+def test_integ_processor_with_scorer_observes_successful_payments():
+    clock = iter(range(0, 10 ** 6, 1000))
+    scorer = FraudScorer(clock=lambda: float(next(clock)), blocklist=["blocked@test.co"])
+    paypal_strategy = PayPalPaymentStrategy("integ_scored@test.co", initial_balance=100.0)
+    processor = PaymentProcessor(paypal_strategy, scorer=scorer)
+    assert processor.process_payment(10.0) is True
+    assert processor.process_payment(500.0) is False  # недостатньо коштів - ознаки не змінюються
+    assert scorer.features(paypal_strategy).count == 1
+
+    blocked = PayPalPaymentStrategy("blocked@test.co", initial_balance=100.0)
+    processor.set_strategy(blocked)
+    assert processor.process_payment(10.0) is False
+    assert blocked.balance == 100.0
+    assert "blocklist" in processor.last_score.reasons
+
+#  PaymentProcessor: паралельні перекази
+
+def test_integ_concurrent_transfers_conserve_total_and_stay_consistent():
+    store = BalanceStore()
+    accounts = [PayPalPaymentStrategy(f"transfer{i}@test.co", initial_balance=1000.0) for i in range(5)]
+    for account in accounts:
+        store.register(account)
+    processor = PaymentProcessor()
+
+    def worker(offset):
+        # Потоки переказують у протилежних напрямках по колу - класичний сценарій взаємоблокування
+        for i in range(300):
+            source = accounts[(i + offset) % 5]
+            target = accounts[(i + offset + (1 if offset % 2 else -1)) % 5]
+            processor.transfer(source, target, 1.0)
+            batch = [(accounts[j], accounts[(j + 1) % 5], 0.5) for j in range(5)]
+            processor.transfer_batch(batch if offset % 2 else batch[::-1])
+
+    threads = [threading.Thread(target=worker, args=(offset,)) for offset in range(4)]
+    for thread in threads:
+        thread.start()
+    with store.snapshot() as snapshot:
+        assert snapshot.total() == pytest.approx(5000.0)
+    for thread in threads:
+        thread.join(timeout=30)
+        assert not thread.is_alive()
+    assert sum(account.balance for account in accounts) == pytest.approx(5000.0)
+    with store.snapshot() as snapshot:
+        assert snapshot.total() == pytest.approx(5000.0)
+
+def test_integ_concurrent_top_ups_and_transfers_lose_no_updates():
+    accounts = [PayPalPaymentStrategy(f"topup{i}@test.co", initial_balance=100.0) for i in range(3)]
+    processor = PaymentProcessor()
+
+    def top_up():
+        for i in range(1000):
+            processor.add_funds(accounts[i % 3], 1.0)
+
+    def shuffle():
+        for i in range(1000):
+            processor.transfer_batch([(accounts[i % 3], accounts[(i + 1) % 3], 0.5),
+                                      (accounts[(i + 2) % 3], accounts[i % 3], 0.25)])
+
+    threads = [threading.Thread(target=top_up) for _ in range(2)] + [threading.Thread(target=shuffle)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(account.balance for account in accounts) == pytest.approx(300.0 + 2000.0)
+
+#  workload: відтворення через PaymentProcessor
+
+def test_integ_replay_is_deterministic():
+    first = workload.replay(workload.generate_workload(seed=11, events=2000, accounts=100))
+    second = workload.replay(iter(list(workload.generate_workload(seed=11, events=2000, accounts=100))))
+    assert first["checksum"] == second["checksum"]
+    assert first["total_balance"] == second["total_balance"]
+    assert first["events"] == 2000 and first["accounts"] == 100
+    assert sum(sum(counts.values()) for counts in first["outcomes"].values()) == 2000
+    assert first["p99_us"] >= first["p50_us"] > 0
+
+def test_integ_replay_at_target_rate():
+    report = workload.replay(workload.generate_workload(seed=2, events=100, accounts=10), rate=2000)
+    assert report["elapsed_s"] >= 99 / 2000
+    assert report["events_per_s"] <= 2000 * 1.05
+
+#  PaymentScheduler + стратегії
+
+def test_integ_scheduler_charges_subscriptions_through_processor():
+    card = CreditCardPaymentStrategy("7777888899990000", "12/30", "123", initial_balance=100.0)
+    paypal = PayPalPaymentStrategy("subscriber@test.co", initial_balance=15.0)
+    scheduler = PaymentScheduler(PaymentProcessor())
+    card_schedule = scheduler.schedule(card, 10.0, interval=60.0, start_at=0.0)
+    paypal_schedule = scheduler.schedule(paypal, 10.0, interval=60.0, start_at=0.0)
+
+    runs = scheduler.run_due(now=0.0)
+    assert all(run.ok for run in runs)
+    runs = {run.schedule_id: run for run in scheduler.run_due(now=130.0)}  # два пропущені запуски
+    assert runs[card_schedule].ok and runs[card_schedule].amount == 20.0
+    assert not runs[paypal_schedule].ok
+    assert (card.balance, paypal.balance) == (70.0, 5.0)
+    paypal_recurring = scheduler.get(paypal_schedule)
+    assert paypal_recurring.failures == 1
+    assert paypal_recurring.next_run == 60.0  # невдалі запуски не списані, але й не втрачені
+    assert paypal_recurring.retry_at == 190.0  # повторна спроба через min(retry_delay, interval)
+    assert scheduler.next_due() == 180.0
+
+    paypal.add_funds(25.0)
+    runs = {run.schedule_id: run for run in scheduler.run_due(now=190.0)}
+    assert runs[paypal_schedule].ok and runs[paypal_schedule].amount == 30.0  # запуски 60, 120 та 180
+    assert runs[card_schedule].ok and runs[card_schedule].amount == 10.0
+    assert (card.balance, paypal.balance) == (60.0, 0.0)
+    assert paypal_recurring.next_run == scheduler.next_due() == 240.0
+    assert paypal_recurring.failures == 0  # лічильник невдач поспіль скинуто
+
+#  Зовнішній постачальник + пул з'єднань
+
+@contextlib.contextmanager
+def _running_fake_provider(idle_timeout=None):
+    server = start_fake_provider(idle_timeout=idle_timeout)
+    provider = providers.register_remote_provider("fake", "Фейковий постачальник", *server.server_address,
+                                                  pool_size=2)
+    try:
+        yield server, provider
+    finally:
+        providers.unregister_provider("fake")
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def fake_provider():
+    with _running_fake_provider() as running:
+        yield running
+
+@pytest.fixture
+def idle_fake_provider():
+    with _running_fake_provider(idle_timeout=0.1) as running:
+        yield running
+
+def test_integ_remote_provider_reuses_pooled_connections(fake_provider):
+    server, provider = fake_provider
+    strategy = provider.create_strategy({"account_id": "acc-1"}, initial_balance=100.0)
+    processor = PaymentProcessor(strategy)
+    for _ in range(20):
+        assert processor.process_payment(2.0) is True
+    assert processor.process_payment(500.0) is False
+    assert strategy.add_funds(10.0) is True
+    assert strategy.balance == pytest.approx(70.0)
+    assert server.accounts["acc-1"] == pytest.approx(70.0)
+    assert server.connections_opened == provider.pool.created == 1
+
+def test_integ_remote_provider_concurrent_payments_bounded_pool(fake_provider):
+    server, provider = fake_provider
+    strategies = [provider.create_strategy({"account_id": f"acc-{i}"}, initial_balance=50.0) for i in range(4)]
+
+    def worker(strategy):
+        for _ in range(10):
+            strategy.pay(1.0)
+
+    threads = [threading.Thread(target=worker, args=(strategy,)) for strategy in strategies]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(server.accounts[f"acc-{i}"] == 40.0 for i in range(4))
+    assert server.connections_opened <= 2
+
+def test_integ_remote_transfer_and_refund_reach_provider(fake_provider):
+    server, provider = fake_provider
+    remote = provider.create_strategy({"account_id": "acc-t"}, initial_balance=30.0)
+    card = CreditCardPaymentStrategy("1111222233334444", "12/30", "123", initial_balance=100.0)
+    processor = PaymentProcessor()
+
+    assert processor.transfer(card, remote, 50.0) is True
+    assert server.accounts["acc-t"] == remote.balance == pytest.approx(80.0)
+    assert processor.transfer(remote, card, 20.0) is True
+    assert server.accounts["acc-t"] == pytest.approx(60.0) and card.balance == 70.0
+
+    processor.set_strategy(remote)
+    assert processor.process_payment(25.0) is True
+    assert processor.refund(processor.last_payment_id, 10.0) is True
+    assert server.accounts["acc-t"] == remote.balance == pytest.approx(45.0)
+
+def test_integ_remote_transfer_rejected_by_provider_rolls_back(fake_provider):
+    server, provider = fake_provider
+    remote = provider.create_strategy({"account_id": "acc-r"}, initial_balance=30.0)
+    card = CreditCardPaymentStrategy("1111222233334444", "12/30", "123", initial_balance=100.0)
+    server.accounts["acc-r"] = 5.0  # баланс змінився в постачальника, локальне значення застаріло
+    assert PaymentProcessor().transfer(remote, card, 20.0) is False
+    assert card.balance == 100.0
+    assert server.accounts["acc-r"] == remote.balance == 5.0
+
+def test_integ_pool_reopens_connections_closed_while_idle(idle_fake_provider):
+    server, provider = idle_fake_provider
+    strategy = provider.create_strategy({"account_id": "acc-i"}, initial_balance=50.0)
+    time.sleep(0.3)  # сервер закриває простоюче з'єднання
+    assert strategy.pay(10.0) is True
+    assert server.accounts["acc-i"] == 40.0
+    assert server.connections_opened == 2 and provider.pool.created == 1
+
+def test_integ_pool_retries_once_when_server_closed_connection(idle_fake_provider, monkeypatch):
+    server, provider = idle_fake_provider
+    strategy = provider.create_strategy({"account_id": "acc-d"}, initial_balance=50.0)
+    time.sleep(0.3)
+    monkeypatch.setattr(providers, "_is_stale", lambda conn: False)  # закриття виявиться лише під час запиту
+    assert strategy.pay(10.0) is True
+    assert server.accounts["acc-d"] == 40.0
+    assert server.requests_handled == 2
+
+def test_integ_service_slow_provider_does_not_block_other_connections(fake_provider):
+    server, _ = fake_provider
+
+    async def scenario():
+        service = PaymentService()
+        app = await start_server(service, "127.0.0.1", 0)
+        port = app.sockets[0].getsockname()[1]
+        try:
+            _, remote = await request("127.0.0.1", port, "POST", "/methods",
+                                      {"type": "fake", "account_id": "acc-slow", "initial_balance": 50.0})
+            _, local = await request("127.0.0.1", port, "POST", "/methods",
+                                     {"type": "paypal", "email": "fast@test.co", "initial_balance": 5.0})
+            server.response_delay = 0.5
+            started = time.perf_counter()
+            slow = asyncio.ensure_future(request("127.0.0.1", port, "POST", "/pay",
+                                                 {"method_id": remote["id"], "amount": 10.0}))
+            await asyncio.sleep(0.05)
+            status, info = await request("127.0.0.1", port, "GET", f"/balance/{local['id']}")
+            balance_elapsed = time.perf_counter() - started
+            assert not slow.done()
+            return (status, info["balance"]), balance_elapsed, await slow
+        finally:
+            app.close()
+            await app.wait_closed()
+
+    balance, balance_elapsed, (status, paid) = asyncio.run(scenario())
+    assert balance == (200, 5.0) and balance_elapsed < 0.3
+    assert status == 200 and paid == {"ok": True, "balance": 40.0}
+    assert server.accounts["acc-slow"] == 40.0
+
+def test_integ_fake_provider_applies_idempotency_key_once(fake_provider):
+    server, provider = fake_provider
+    provider.create_strategy({"account_id": "acc-k"}, initial_balance=50.0)
+    for _ in range(2):
+        status, data = provider.pool.request_json("POST", "/charge", {"account": "acc-k", "amount": 10.0},
+                                                  headers={"Idempotency-Key": "charge-1"})
+        assert (status, data) == (200, {"ok": True, "balance": 40.0})
+    assert server.accounts["acc-k"] == 40.0
+
+def test_integ_service_creates_remote_provider_method(fake_provider):
+    service = PaymentService()
+    status, created = service.dispatch("POST", "/methods", b'{"type": "fake", "account_id": "svc-1", "initial_balance": 5}')
+    assert status == 201
+    assert service.pay({"method_id": created["id"], "amount": 2.0}) == {"ok": True, "balance": 3.0}
+
+def test_integ_replay_unknown_method_type_keeps_account_numbers():
+    events = [
+        workload.WorkloadEvent(workload.CREATE, 0, 100.0, "card"),
+        workload.WorkloadEvent(workload.CREATE, 1, 100.0, "giftcard"),  # невідомий цій версії тип
+        workload.WorkloadEvent(workload.CREATE, 2, 50.0, "paypal"),
+        workload.WorkloadEvent(workload.PAY, 1, 10.0),
+        workload.WorkloadEvent(workload.ADD_FUNDS, 1, 10.0),
+        workload.WorkloadEvent(workload.PAY, 2, 20.0),
+        workload.WorkloadEvent(workload.PAY, 7, 1.0),
+    ]
+    report = workload.replay(iter(events))
+    assert report["accounts"] == 2
+    assert report["outcomes"][workload.CREATE] == {"ok": 2, "failed": 1}
+    assert report["outcomes"][workload.PAY] == {"ok": 1, "failed": 2}
+    assert report["outcomes"][workload.ADD_FUNDS] == {"ok": 0, "failed": 1}
+    assert report["total_balance"] == 130.0
+    assert report["checksum"] == workload.replay(iter(events))["checksum"]
@@ -6,6 +6,20 @@ from payment_strategies import (
     PaymentStrategy
 )
 from payment_processor import PaymentProcessor
+from payment_service import PaymentService
+from balance_store import BalanceStore
+from fraud_scoring import APPROVE, DECLINE, FLAG, FraudScorer, ScoreResult
+import console_app
+from collections import Counter
+import workload
+from latency_stats import percentile
+from scheduler import CATCH_UP_SKIP, PaymentScheduler
+import providers
+import gc
+import io
+import socket
+import sys
+import json
 from unittest.mock import MagicMock
 
 # CreditCardPaymentStrategy
@@ -214,3 +228,635 @@ def test_payment_processor_process_payment_negative_amount_bypasses_strategy():
     assert processor.process_payment(-10.0) is False
     mock_strategy.pay.assert_not_called()
 
+#  PaymentService
+
+def test_service_add_method_and_balance():
+    service = PaymentService()
+    status, created = service.dispatch("POST", "/methods", b'{"type": "paypal", "email": "svc@example.com", "initial_balance": 40}')
+    assert status == 201
+    status, info = service.dispatch("GET", f"/balance/{created['id']}", b"")
+    assert status == 200
+    assert info["balance"] == 40.0
+
+def test_service_pay_and_topup():
+    service = PaymentService()
+    method_id = service.add_method({"type": "card", "card_number": "1111", "expiry_date": "01/26",
+                                    "cvv": "000", "initial_balance": 100.0})["id"]
+    assert service.pay({"method_id": method_id, "amount": 30.0}) == {"ok": True, "balance": 70.0}
+    assert service.pay({"method_id": method_id, "amount": 500.0}) == {"ok": False, "balance": 70.0}
+    assert service.top_up({"method_id": method_id, "amount": 5.0}) == {"ok": True, "balance": 75.0}
+
+def test_service_quiet_output_restores_stdout(capsys):
+    stdout = sys.stdout
+    service = PaymentService()
+    capsys.readouterr()
+    service.add_method({"type": "paypal", "email": "quiet@example.com", "initial_balance": 1.0})
+    assert sys.stdout is stdout
+    assert capsys.readouterr().out == ""
+
+def test_service_errors():
+    service = PaymentService()
+    assert service.dispatch("GET", "/balance/42", b"")[0] == 404
+    assert service.dispatch("POST", "/pay", b"not json")[0] == 400
+    assert service.dispatch("GET", "/pay", b"")[0] == 405
+    assert service.dispatch("POST", "/methods", b'{"type": "paypal", "email": "bad"}')[0] == 400
+
+def test_service_batch_reports_each_operation():
+    service = PaymentService()
+    method_id = service.add_method({"type": "paypal", "email": "b@example.com", "initial_balance": 10.0})["id"]
+    results = service.batch([
+        {"op": "pay", "method_id": method_id, "amount": 4.0},
+        {"op": "pay", "method_id": 99, "amount": 1.0},
+        {"op": "unknown"},
+        {"op": "balance", "method_id": method_id},
+    ])
+    assert [r["status"] for r in results] == [200, 404, 400, 200]
+    assert results[3]["result"]["balance"] == 6.0
+
+def test_service_rejects_non_finite_numbers():
+    service = PaymentService()
+    method_id = service.add_method({"type": "paypal", "email": "nan@example.com", "initial_balance": 10.0})["id"]
+    assert service.dispatch("POST", "/pay", b'{"method_id": %d, "amount": NaN}' % method_id)[0] == 400
+    assert service.dispatch("POST", "/topup", b'{"method_id": %d, "amount": Infinity}' % method_id)[0] == 400
+    assert service.dispatch("POST", "/methods", b'{"type": "paypal", "email": "x@example.com", "initial_balance": NaN}')[0] == 400
+    assert service.balance(method_id)["balance"] == 10.0
+
+def test_service_batch_isolates_unexpected_errors():
+    service = PaymentService()
+    method_id = service.add_method({"type": "paypal", "email": "iso@example.com", "initial_balance": 10.0})["id"]
+    status, results = service.dispatch("POST", "/batch", json.dumps([
+        {"op": "pay", "method_id": method_id, "amount": 4.0},
+        {"op": "add_method", "type": "paypal", "email": "n@example.com", "initial_balance": None},
+        {"op": "balance", "method_id": method_id},
+    ]).encode())
+    assert status == 200
+    assert [r["status"] for r in results] == [200, 400, 200]
+    assert results[2]["result"]["balance"] == 6.0
+
+    service.top_up = MagicMock(side_effect=RuntimeError("збій"))
+    results = service.batch([{"op": "topup", "method_id": method_id, "amount": 1.0},
+                             {"op": "pay", "method_id": method_id, "amount": 1.0}])
+    assert [r["status"] for r in results] == [500, 200]
+
+#  console_app: сценарний режим
+
+@pytest.fixture
+def empty_console():
+    console_app.clear_saved_methods()
+    yield console_app
+    console_app.clear_saved_methods()
+
+def test_script_text_and_json_commands(empty_console):
+    script = """
+    # коментар
+    add card 1111222233334444 12/28 123 100
+    add paypal script@example.com
+    {"op": "topup", "method": 2, "amount": 20}
+    pay 1 30
+    pay 2 50
+    list
+    """
+    out = io.StringIO()
+    assert empty_console.run_script(script, out) == [True, True, True, True, False, True]
+    assert empty_console.saved_payment_methods[0].balance == 70.0
+    assert empty_console.saved_payment_methods[1].balance == 20.0
+    assert "Картка ...4444" in out.getvalue()
+    assert "Головне меню" not in out.getvalue()
+
+def test_script_json_array(empty_console):
+    script = '[{"op": "add", "type": "crypto", "wallet_address": "%s", "initial_balance": 10}, ' \
+             '{"op": "pay", "method": 1, "amount": 5}]' % VALID_CRYPTO_ADDRESS
+    assert empty_console.run_script(script, io.StringIO()) == [True, True]
+    assert empty_console.saved_payment_methods[0].balance == pytest.approx(10.0 - 5.0 - 0.1)
+
+def test_script_syntax_error_executes_nothing(empty_console):
+    with pytest.raises(ValueError, match="Рядок 2"):
+        empty_console.run_script("add paypal x@example.com\npay 1\n", io.StringIO())
+    assert empty_console.saved_payment_methods == []
+
+def test_script_invalid_method_number(empty_console):
+    assert empty_console.run_script("pay 3 10", io.StringIO()) == [False]
+
+def test_script_rejects_non_finite_numbers(empty_console):
+    for script in ("add paypal f@example.com 5\ntopup 1 nan", "add paypal f@example.com 5\npay 1 inf",
+                   "add paypal f@example.com -inf", '{"op": "pay", "method": 1, "amount": NaN}'):
+        with pytest.raises(ValueError, match="скінченним"):
+            empty_console.run_script(script, io.StringIO())
+    assert empty_console.saved_payment_methods == []
+
+def test_script_rejects_non_string_provider_fields(empty_console):
+    for script in ('[{"op": "add", "type": "card", "card_number": 1234567812345678, "expiry_date": "12/30", '
+                   '"cvv": "123"}, {"op": "list"}]',
+                   '[{"op": "add", "type": "paypal", "email": "ok@example.com"}, '
+                   '{"op": "add", "type": "paypal", "email": ["a@b.c"]}]'):
+        with pytest.raises(ValueError, match="рядками"):
+            empty_console.run_script(script, io.StringIO())
+    assert empty_console.saved_payment_methods == []
+
+#  console_app: посторінковий перегляд
+
+def test_list_methods_page_cursor_and_filter(empty_console):
+    for i in range(5):
+        empty_console.add_payment_method(PayPalPaymentStrategy(f"user{i}@example.com", initial_balance=i))
+    empty_console.add_payment_method(CreditCardPaymentStrategy("9999888877776666", "12/28", "321", 10.0))
+
+    page, next_cursor = empty_console.list_methods_page(cursor=0, limit=4)
+    assert [number for number, _, _ in page] == [1, 2, 3, 4]
+    assert next_cursor == 4
+    page, next_cursor = empty_console.list_methods_page(cursor=next_cursor, limit=4)
+    assert [number for number, _, _ in page] == [5, 6]
+    assert next_cursor is None
+    assert page[1][1] == "CreditCard (Картка ...6666, Баланс: $10.00)"
+
+    page, _ = empty_console.list_methods_page(method_type="CreditCard")
+    assert len(page) == 1 and page[0][2].card_number == "9999888877776666"
+    assert empty_console.count_saved_methods(filter_for_add_funds=True) == 6
+    assert empty_console.get_saved_method(2).email == "user1@example.com"
+    assert empty_console.get_saved_method(7) is None
+
+def test_descriptor_cache_invalidated_on_balance_change(empty_console):
+    strategy = empty_console.add_payment_method(PayPalPaymentStrategy("cache@example.com", initial_balance=5.0))
+    strategy.get_balance_info = MagicMock(wraps=strategy.get_balance_info)
+    assert "Баланс: $5.00" in empty_console.describe_method(0)
+    empty_console.describe_method(0)
+    assert strategy.get_balance_info.call_count == 1
+    strategy.add_funds(2.5)
+    assert "Баланс: $7.50" in empty_console.describe_method(0)
+    assert strategy.get_balance_info.call_count == 2
+
+def test_methods_appended_directly_are_indexed(empty_console):
+    empty_console.saved_payment_methods.append(PayPalPaymentStrategy("direct@example.com"))
+    assert empty_console.count_saved_methods() == 1
+    assert empty_console.count_saved_methods(method_type="PayPal") == 1
+
+def test_handle_make_payment_selects_method_from_next_page(empty_console, monkeypatch):
+    monkeypatch.setattr(empty_console, "LIST_PAGE_SIZE", 2)
+    for i in range(3):
+        empty_console.add_payment_method(PayPalPaymentStrategy(f"page{i}@example.com", initial_balance=10.0))
+    answers = iter(["n", "3", "4"])
+    monkeypatch.setattr("builtins.input", lambda _: next(answers))
+    empty_console.handle_make_payment()
+    assert empty_console.saved_payment_methods[2].balance == 6.0
+
+#  BalanceStore
+
+def test_balance_store_tracks_strategy_balance_changes():
+    store = BalanceStore()
+    strategy = PayPalPaymentStrategy("store@example.com", initial_balance=50.0)
+    account_id = store.register(strategy)
+    before = store.snapshot()
+    assert strategy.pay(20.0) is True
+    with store.snapshot() as after:
+        assert after[account_id] == 30.0
+    assert before[account_id] == 50.0
+    before.release()
+
+def test_balance_store_transaction_commits_one_version():
+    store = BalanceStore()
+    first = CreditCardPaymentStrategy("1111", "01/26", "000", initial_balance=10.0)
+    second = CreditCardPaymentStrategy("2222", "01/26", "000", initial_balance=0.0)
+    first_id, second_id = store.register(first), store.register(second)
+    version = store.version
+    with store.transaction():
+        first.balance -= 10.0
+        assert store.version == version  # до завершення транзакції зміни не видно
+        second.balance += 10.0
+    assert store.version == version + 1
+    with store.snapshot() as snapshot:
+        assert (snapshot[first_id], snapshot[second_id]) == (0.0, 10.0)
+
+def test_balance_store_transaction_discarded_on_error():
+    store = BalanceStore()
+    strategy = PayPalPaymentStrategy("rollback@example.com", initial_balance=5.0)
+    account_id = store.register(strategy)
+    with pytest.raises(RuntimeError):
+        with store.transaction():
+            strategy.balance = 100.0
+            raise RuntimeError("збій")
+    with store.snapshot() as snapshot:
+        assert snapshot[account_id] == 5.0
+
+def test_balance_store_collect_keeps_pinned_versions():
+    store = BalanceStore(gc_interval=10 ** 6)
+    strategy = PayPalPaymentStrategy("gc@example.com", initial_balance=100.0)
+    account_id = store.register(strategy)
+    pinned = store.snapshot()
+    for _ in range(10):
+        strategy.pay(1.0)
+    store.collect()
+    assert pinned[account_id] == 100.0
+    pinned.release()
+    store.collect()
+    assert len(store._histories[account_id][0]) == 1
+    with store.snapshot() as snapshot:
+        assert snapshot[account_id] == 90.0
+
+def test_balance_store_rejects_double_registration():
+    store = BalanceStore()
+    strategy = PayPalPaymentStrategy("twice@example.com")
+    store.register(strategy)
+    with pytest.raises(ValueError):
+        BalanceStore().register(strategy)
+
+#  FraudScorer
+
+def test_fraud_features_updated_incrementally():
+    scorer = FraudScorer()
+    strategy = PayPalPaymentStrategy("features@example.com")
+    for t, amount in enumerate([10.0, 20.0, 30.0]):
+        scorer.observe(strategy, amount, now=t * 100.0)
+    features = scorer.features(strategy)
+    assert (features.count, features.mean, features.last_payment_at) == (3, 20.0, 200.0)
+    assert features.std == pytest.approx(10.0)
+
+def test_fraud_features_released_with_strategy():
+    scorer = FraudScorer()
+    strategy = PayPalPaymentStrategy("gone@example.com")
+    scorer.observe(strategy, 10.0, now=0.0)
+    assert len(scorer._features) == 1
+    del strategy
+    gc.collect()
+    assert len(scorer._features) == 0
+
+def test_fraud_new_account_approved_with_small_risk():
+    result = FraudScorer().score(CreditCardPaymentStrategy("1111", "01/26", "000"), 10.0, now=0.0)
+    assert result.decision == APPROVE
+    assert result.reasons == ("new_account",)
+
+def test_fraud_unusual_amount_flagged_and_with_velocity_declined():
+    scorer = FraudScorer()
+    strategy = CreditCardPaymentStrategy("1111", "01/26", "000")
+    for t, amount in enumerate([10.0, 11.0, 9.0, 10.0]):
+        scorer.observe(strategy, amount, now=t * 1000.0)
+    assert scorer.score(strategy, 10.5, now=10000.0).decision == APPROVE
+    result = scorer.score(strategy, 500.0, now=10000.0)
+    assert (result.decision, result.reasons) == (FLAG, ("amount",))
+    result = scorer.score(strategy, 500.0, now=3000.5)
+    assert result.decision == DECLINE
+    assert set(result.reasons) == {"amount", "velocity"}
+
+def test_fraud_blocklisted_identity_declined():
+    scorer = FraudScorer(blocklist=["Bad@Example.com"])
+    assert scorer.score(PayPalPaymentStrategy("bad@example.com"), 1.0, now=0.0).decision == DECLINE
+    scorer.block(VALID_CRYPTO_ADDRESS)
+    assert scorer.score(CryptoPaymentStrategy(VALID_CRYPTO_ADDRESS), 1.0, now=0.0).decision == DECLINE
+
+def test_fraud_score_batch_matches_single_scores():
+    scorer = FraudScorer(clock=lambda: 50.0)
+    card = CreditCardPaymentStrategy("1111", "01/26", "000")
+    wallet = CryptoPaymentStrategy(VALID_CRYPTO_ADDRESS)
+    payments = [(card, 5.0), (wallet, 7.0), (card, 1000.0)]
+    assert scorer.score_batch(payments) == [scorer.score(s, a) for s, a in payments]
+
+def test_payment_processor_declines_before_strategy_when_scorer_declines():
+    mock_strategy = MagicMock(spec=PaymentStrategy)
+    scorer = MagicMock(spec=FraudScorer)
+    scorer.score.return_value = ScoreResult(1.0, DECLINE, ("blocklist",))
+    processor = PaymentProcessor(mock_strategy, scorer=scorer)
+    assert processor.process_payment(10.0) is False
+    mock_strategy.pay.assert_not_called()
+    scorer.observe.assert_not_called()
+
+#  PaymentProcessor: повернення та перекази
+
+def test_payment_processor_full_and_partial_refund():
+    strategy = PayPalPaymentStrategy("refund@example.com", initial_balance=100.0)
+    processor = PaymentProcessor(strategy)
+    assert processor.process_payment(40.0) is True
+    payment_id = processor.last_payment_id
+    assert processor.refund(payment_id, 15.0) is True
+    assert strategy.balance == 75.0
+    assert processor.refund(payment_id, 30.0) is False  # більше, ніж залишок
+    assert processor.refund(payment_id) is True
+    assert strategy.balance == 100.0
+    assert processor.get_payment(payment_id).refundable == 0.0
+    assert processor.refund(payment_id) is False
+
+def test_payment_processor_refund_unknown_payment():
+    assert PaymentProcessor().refund(12345) is False
+
+def test_payment_processor_failed_payment_not_recorded():
+    processor = PaymentProcessor(PayPalPaymentStrategy("norec@example.com", initial_balance=1.0))
+    assert processor.process_payment(5.0) is False
+    assert processor.last_payment_id is None
+
+def test_payment_processor_transfer_moves_funds_without_fee():
+    card = CreditCardPaymentStrategy("1111", "01/26", "000", initial_balance=50.0)
+    wallet = CryptoPaymentStrategy(VALID_CRYPTO_ADDRESS, initial_balance=0.0)
+    processor = PaymentProcessor()
+    assert processor.transfer(card, wallet, 20.0) is True
+    assert (card.balance, wallet.balance) == (30.0, 20.0)
+    assert processor.transfer(card, wallet, 31.0) is False
+    assert (card.balance, wallet.balance) == (30.0, 20.0)
+    assert processor.transfer(card, card, 1.0) is False
+
+def test_payment_processor_transfer_batch_all_or_nothing():
+    a = PayPalPaymentStrategy("a@example.com", initial_balance=10.0)
+    b = PayPalPaymentStrategy("b@example.com", initial_balance=0.0)
+    c = PayPalPaymentStrategy("c@example.com", initial_balance=0.0)
+    processor = PaymentProcessor()
+    # b отримує 10 і одразу переказує 10 далі - сальдо дозволяє пакет
+    assert processor.transfer_batch([(b, c, 10.0), (a, b, 10.0)]) is True
+    assert (a.balance, b.balance, c.balance) == (0.0, 0.0, 10.0)
+    assert processor.transfer_batch([(c, a, 5.0), (b, a, 1.0)]) is False
+    assert (a.balance, b.balance, c.balance) == (0.0, 0.0, 10.0)
+    assert processor.transfer_batch([(c, a, 5.0), (a, b, -1.0)]) is False
+    assert processor.transfer_batch([]) is True
+
+def test_payment_processor_rejects_non_finite_refund_transfer_and_top_up():
+    a = PayPalPaymentStrategy("nan-a@example.com", initial_balance=100.0)
+    b = PayPalPaymentStrategy("nan-b@example.com", initial_balance=100.0)
+    processor = PaymentProcessor(a)
+    assert processor.process_payment(40.0) is True
+    payment_id = processor.last_payment_id
+    for bad in (float("nan"), float("inf"), float("-inf")):
+        assert processor.transfer(a, b, bad) is False
+        assert processor.transfer_batch([(a, b, 1.0), (b, a, bad)]) is False
+        assert processor.refund(payment_id, bad) is False
+        assert processor.add_funds(a, bad) is False
+    assert (a.balance, b.balance) == (60.0, 100.0)
+    assert processor.refund(payment_id) is True
+    assert a.balance == 100.0
+
+def test_payment_processor_history_is_bounded():
+    strategy = PayPalPaymentStrategy("history@example.com", initial_balance=100.0)
+    processor = PaymentProcessor(strategy, payment_history=3)
+    for _ in range(5):
+        assert processor.process_payment(1.0) is True
+    assert len(processor._payments) == 3
+    assert processor.get_payment(1) is None and processor.get_payment(5) is not None
+    assert processor.refund(1) is False
+
+def test_payment_processor_history_can_be_disabled():
+    processor = PaymentProcessor(PayPalPaymentStrategy("nohistory@example.com", initial_balance=10.0),
+                                 payment_history=0)
+    assert processor.process_payment(1.0) is True
+    assert processor.last_payment_id == 1
+    assert processor._payments == {}
+    with pytest.raises(ValueError):
+        PaymentProcessor(payment_history=-1)
+
+def test_payment_processor_add_funds():
+    strategy = PayPalPaymentStrategy("topup@example.com", initial_balance=1.0)
+    processor = PaymentProcessor()
+    assert processor.add_funds(strategy, 4.0) is True
+    assert processor.add_funds(strategy, -1.0) is False
+    assert strategy.balance == 5.0
+
+#  workload: генератор навантаження
+
+def test_workload_same_seed_same_stream():
+    first = list(workload.generate_workload(seed=7, events=500, accounts=50))
+    assert first == list(workload.generate_workload(seed=7, events=500, accounts=50))
+    assert first != list(workload.generate_workload(seed=8, events=500, accounts=50))
+
+def test_workload_creates_accounts_before_use_with_method_mix():
+    events = list(workload.generate_workload(seed=1, events=5000, accounts=200))
+    created = 0
+    for event in events:
+        if event.kind == workload.CREATE:
+            assert event.account == created
+            created += 1
+        else:
+            assert 0 <= event.account < created and event.amount > 0
+    assert created == 200
+    types = Counter(event.method_type for event in events if event.kind == workload.CREATE)
+    assert set(types) == {"card", "paypal", "crypto"}
+    assert types["card"] > types["crypto"]
+
+def test_workload_hot_accounts_get_most_traffic():
+    events = list(workload.generate_workload(seed=3, events=20000, accounts=1000, skew=1.2))
+    traffic = Counter(event.account for event in events if event.kind != workload.CREATE)
+    top_ten = sum(count for _, count in traffic.most_common(10))
+    assert top_ten > 0.3 * sum(traffic.values())
+
+def test_workload_zipf_only_over_created_accounts():
+    # Поки створено c рахунків, частка першого має бути 1 / H(c, skew)
+    skew = 1.1
+    created, observed, expected = 0, 0, 0.0
+    for event in workload.generate_workload(seed=3, events=20000, accounts=100, skew=skew):
+        if event.kind == workload.CREATE:
+            created += 1
+            continue
+        if created < 20:
+            observed += event.account == 0
+            expected += 1.0 / sum(1.0 / rank ** skew for rank in range(1, created + 1))
+    assert observed == pytest.approx(expected, rel=0.05)
+
+def test_workload_save_and_load_roundtrip(tmp_path):
+    events = list(workload.generate_workload(seed=5, events=100, accounts=10))
+    path = tmp_path / "workload.jsonl"
+    workload.save_workload(events, str(path))
+    assert workload.load_workload(str(path)) == events
+
+#  PaymentScheduler
+
+def test_scheduler_runs_only_due_payments_in_time_order():
+    processor = MagicMock(spec=PaymentProcessor)
+    processor.process_payment.return_value = True
+    scheduler = PaymentScheduler(processor, clock=lambda: 0.0)
+    late = scheduler.schedule(MagicMock(spec=PaymentStrategy), 5.0, interval=100.0, start_at=50.0)
+    early = scheduler.schedule(MagicMock(spec=PaymentStrategy), 3.0, interval=100.0, start_at=10.0)
+    assert scheduler.next_due() == 10.0
+    assert scheduler.run_due(now=5.0) == []
+    assert [run.schedule_id for run in scheduler.run_due(now=60.0)] == [early, late]
+    assert scheduler.next_due() == 110.0
+
+def test_scheduler_bulk_catch_up_after_downtime():
+    processor = MagicMock(spec=PaymentProcessor)
+    processor.process_payment.return_value = True
+    scheduler = PaymentScheduler(processor)
+    schedule_id = scheduler.schedule(MagicMock(spec=PaymentStrategy), 10.0, interval=30.0, start_at=0.0)
+    (run,) = scheduler.run_due(now=95.0)  # пропущено запуски 0, 30, 60, 90
+    assert (run.runs, run.amount, run.ok) == (4, 40.0, True)
+    processor.process_payment.assert_called_once_with(40.0)
+    assert scheduler.get(schedule_id).next_run == 120.0
+
+def test_scheduler_skip_catch_up_and_limited_runs():
+    processor = MagicMock(spec=PaymentProcessor)
+    processor.process_payment.return_value = True
+    scheduler = PaymentScheduler(processor, catch_up=CATCH_UP_SKIP)
+    schedule_id = scheduler.schedule(MagicMock(spec=PaymentStrategy), 10.0, interval=30.0, start_at=0.0, runs=3)
+    (run,) = scheduler.run_due(now=65.0)
+    assert (run.runs, run.amount) == (1, 10.0)
+    assert scheduler.get(schedule_id) is None  # пропущені запуски теж вичерпують ліміт
+
+def test_scheduler_failed_charge_keeps_runs_due_and_retries():
+    processor = MagicMock(spec=PaymentProcessor)
+    processor.process_payment.side_effect = [False, False, True]  # сумарне списання, потім один запуск
+    scheduler = PaymentScheduler(processor, retry_delay=5.0)
+    schedule_id = scheduler.schedule(MagicMock(spec=PaymentStrategy), 10.0, interval=30.0, start_at=0.0, runs=2)
+    (run,) = scheduler.run_due(now=35.0)
+    assert not run.ok and run.runs == 2
+    recurring = scheduler.get(schedule_id)
+    assert (recurring.next_run, recurring.remaining, recurring.failures) == (0.0, 2, 1)
+    assert scheduler.next_due() == 40.0
+    assert scheduler.run_due(now=39.0) == []
+    (run,) = scheduler.run_due(now=40.0)
+    assert run.ok and run.amount == 20.0
+    assert scheduler.get(schedule_id) is None
+    assert scheduler.next_due() is None
+    assert len(scheduler) == 0
+
+def test_scheduler_bulk_failure_charges_runs_one_by_one():
+    strategy = PayPalPaymentStrategy("partial@example.com", initial_balance=25.0)
+    scheduler = PaymentScheduler(PaymentProcessor(), retry_delay=5.0)
+    schedule_id = scheduler.schedule(strategy, 10.0, interval=30.0, start_at=0.0)
+    (run,) = scheduler.run_due(now=65.0)  # запуски 0, 30, 60 - на всі коштів не вистачає
+    assert run.ok and (run.runs, run.amount) == (2, 20.0)
+    recurring = scheduler.get(schedule_id)
+    assert (recurring.next_run, recurring.failures, strategy.balance) == (60.0, 0, 5.0)
+    assert scheduler.next_due() == 70.0  # залишок боргу - повторна спроба
+
+def test_scheduler_suspends_after_max_failures_and_resumes():
+    processor = MagicMock(spec=PaymentProcessor)
+    processor.process_payment.return_value = False
+    scheduler = PaymentScheduler(processor, clock=lambda: 500.0, retry_delay=5.0, max_failures=3)
+    schedule_id = scheduler.schedule(MagicMock(spec=PaymentStrategy), 10.0, interval=30.0, start_at=0.0)
+    for now in (0.0, 5.0, 10.0):
+        (run,) = scheduler.run_due(now=now)
+        assert not run.ok
+    recurring = scheduler.get(schedule_id)
+    assert recurring.suspended and recurring.failures == 3
+    assert scheduler.next_due() is None and scheduler.run_due(now=1000.0) == []
+    assert scheduler.resume(schedule_id) is True
+    assert scheduler.next_due() == 500.0 and recurring.next_run == 0.0
+    assert scheduler.resume(schedule_id) is False
+
+def test_scheduler_exception_during_charge_keeps_schedules():
+    processor = MagicMock(spec=PaymentProcessor)
+    processor.process_payment.side_effect = [RuntimeError("scorer"), True]
+    scheduler = PaymentScheduler(processor, retry_delay=5.0)
+    broken = scheduler.schedule(MagicMock(spec=PaymentStrategy), 1.0, interval=30.0, start_at=0.0)
+    healthy = scheduler.schedule(MagicMock(spec=PaymentStrategy), 1.0, interval=30.0, start_at=1.0)
+    runs = scheduler.run_due(now=2.0)
+    assert [(run.schedule_id, run.ok) for run in runs] == [(broken, False), (healthy, True)]
+    assert scheduler.get(broken).failures == 1
+    assert scheduler.next_due() == 7.0
+
+def test_scheduler_cancel_and_validation():
+    scheduler = PaymentScheduler(MagicMock(spec=PaymentProcessor))
+    schedule_id = scheduler.schedule(MagicMock(spec=PaymentStrategy), 1.0, interval=10.0, start_at=0.0)
+    assert scheduler.cancel(schedule_id) is True
+    assert scheduler.cancel(schedule_id) is False
+    assert scheduler.run_due(now=100.0) == []
+    with pytest.raises(ValueError):
+        scheduler.schedule(MagicMock(spec=PaymentStrategy), 1.0, interval=0)
+    for amount, interval, start_at in ((float("nan"), 1.0, 0.0), (float("inf"), 1.0, 0.0),
+                                       (1.0, float("nan"), 0.0), (1.0, float("inf"), 0.0),
+                                       (1.0, 1.0, float("nan"))):
+        with pytest.raises(ValueError):
+            scheduler.schedule(MagicMock(spec=PaymentStrategy), amount, interval=interval, start_at=start_at)
+    with pytest.raises(ValueError):
+        PaymentScheduler(catch_up="each")
+    with pytest.raises(ValueError):
+        PaymentScheduler(max_failures=0)
+
+#  Реєстр постачальників
+
+class LoyaltyPointsPaymentStrategy(PaymentStrategy):
+    def __init__(self, member_id: str, initial_balance: float = 0.0):
+        self.member_id = member_id
+        self.balance = initial_balance
+
+    def pay(self, amount: float) -> bool:
+        return False
+
+@pytest.fixture
+def loyalty_provider():
+    provider = providers.register_provider(providers.PaymentProvider(
+        "loyalty", "Бонусні бали", LoyaltyPointsPaymentStrategy,
+        fields=(("member_id", "Введіть номер учасника: "),),
+        formatter=lambda strategy: f"Учасник {strategy.member_id}",
+        supports_add_funds=False,
+    ))
+    yield provider
+    providers.unregister_provider("loyalty")
+
+def test_builtin_providers_registered_in_menu_order():
+    assert [provider.key for provider in providers.list_providers()[:3]] == ["card", "paypal", "crypto"]
+    card = CreditCardPaymentStrategy("1234567812345678", "12/25", "123")
+    assert providers.provider_for(card).describe(card) == "Картка ...5678"
+
+def test_provider_creates_strategy_and_rejects_duplicate_key(loyalty_provider):
+    strategy = loyalty_provider.create_strategy({"member_id": "M-1"}, initial_balance=3.0)
+    assert isinstance(strategy, LoyaltyPointsPaymentStrategy) and strategy.balance == 3.0
+    assert providers.provider_for(strategy) is loyalty_provider
+    with pytest.raises(ValueError):
+        providers.register_provider(loyalty_provider)
+
+def test_console_uses_registered_provider(empty_console, loyalty_provider, capsys):
+    empty_console.display_add_method_menu()
+    assert "4. Бонусні бали" in capsys.readouterr().out
+    assert empty_console.run_script("add loyalty M-7 5\nlist", io.StringIO()) == [True, True]
+    assert empty_console.describe_method(0) == "LoyaltyPoints (Учасник M-7)"
+    assert empty_console.count_saved_methods(filter_for_add_funds=True) == 0
+
+def test_connection_pool_reuses_and_bounds_connections():
+    pool = providers.ConnectionPool("localhost", 1, max_size=2, timeout=0.01, factory=MagicMock)
+    with pool.connection() as first:
+        with pool.connection() as second:
+            assert first is not second
+            with pytest.raises(providers.ProviderError):
+                with pool.connection():
+                    pass
+    with pool.connection() as again:
+        assert again in (first, second)
+    assert pool.created == 2
+
+def test_connection_pool_discards_broken_connection():
+    pool = providers.ConnectionPool("localhost", 1, max_size=1, factory=MagicMock)
+    with pytest.raises(OSError):
+        with pool.connection() as conn:
+            raise OSError("обрив")
+    conn.close.assert_called_once()
+    with pool.connection() as fresh:
+        assert fresh is not conn
+
+def test_connection_pool_reports_non_json_reply_as_provider_error():
+    conn = MagicMock()
+    conn.getresponse.return_value.status = 502
+    conn.getresponse.return_value.read.return_value = b"<html>Bad Gateway</html>"
+    pool = providers.ConnectionPool("localhost", 1, factory=lambda: conn)
+    with pytest.raises(providers.ProviderError, match="HTTP 502"):
+        pool.request_json("POST", "/charge", {"account": "a", "amount": 1.0})
+
+def test_replacing_provider_closes_old_pool():
+    old_pool = providers.ConnectionPool("localhost", 1, factory=MagicMock)
+    with old_pool.connection() as conn:
+        pass
+    providers.register_provider(providers.PaymentProvider(
+        "pooled", "Пул", LoyaltyPointsPaymentStrategy, fields=(), formatter=str, pool=old_pool))
+    new_pool = providers.ConnectionPool("localhost", 1, factory=MagicMock)
+    providers.register_provider(providers.PaymentProvider(
+        "pooled", "Пул", LoyaltyPointsPaymentStrategy, fields=(), formatter=str, pool=new_pool), replace=True)
+    try:
+        conn.close.assert_called_once()
+        with pytest.raises(providers.ProviderError):
+            old_pool.request_json("GET", "/")
+    finally:
+        providers.unregister_provider("pooled")
+
+@pytest.fixture
+def unreachable_provider():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]  # після закриття на порту ніхто не слухає
+    yield providers.register_remote_provider("down", "Недоступний постачальник", "127.0.0.1", port, timeout=0.5)
+    providers.unregister_provider("down")
+
+def test_unreachable_provider_reported_by_console_and_service(empty_console, unreachable_provider):
+    assert empty_console.run_script("add down acc-1 5", io.StringIO()) == [False]
+    assert empty_console.count_saved_methods() == 0
+    service = PaymentService()
+    status, body = service.dispatch("POST", "/methods", json.dumps({"type": "down", "account_id": "acc-1"}).encode())
+    assert status == 502 and "постачальником" in body["error"]
+    service.close()
+
+#  latency_stats
+
+def test_percentile():
+    values = [float(i) for i in range(1, 101)]
+    assert percentile(values, 0.5) == 51.0
+    assert percentile(values, 0.99) == 99.0
+    assert percentile([], 0.99) == 0.0
@@ -0,0 +1,214 @@
+# workload.py
+# Генератор детермінованих синтетичних навантажень та драйвер їх відтворення.
+#
+# Однаковий seed дає однаковий потік подій (створення рахунку, pay, add_funds),
+# тож потік можна зберегти, відтворити на іншій версії коду і порівняти
+# контрольні суми фінальних балансів.
+
+import argparse
+import contextlib
+import hashlib
+import json
+import math
+import os
+import random
+import time
+from bisect import bisect
+from itertools import accumulate
+from typing import Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+from payment_strategies import (
+    CreditCardPaymentStrategy,
+    PayPalPaymentStrategy,
+    CryptoPaymentStrategy,
+    PaymentStrategy
+)
+from payment_processor import PaymentProcessor
+from latency_stats import percentile
+
+CREATE = "create"
+PAY = "pay"
+ADD_FUNDS = "add_funds"
+
+# Частки типів методів серед нових рахунків
+DEFAULT_METHOD_MIX = {"card": 0.6, "paypal": 0.3, "crypto": 0.1}
+
+
+class WorkloadEvent(NamedTuple):
+    kind: str           # CREATE, PAY або ADD_FUNDS
+    account: int        # Номер рахунку в порядку створення
+    amount: float       # Сума операції або початковий баланс для CREATE
+    method_type: str = ""  # Лише для CREATE: "card", "paypal" або "crypto"
+
+
+def generate_workload(seed: int, events: int, accounts: int = 1000,
+                      method_mix: Optional[Dict[str, float]] = None, skew: float = 1.1,
+                      pay_share: float = 0.8, amount_median: float = 25.0) -> Iterator[WorkloadEvent]:
+    """
+    Генерує потік подій. Рахунки створюються поступово (до accounts штук);
+    вибір рахунку для операції підпорядковується закону Ципфа з параметром
+    skew, тож невелика кількість "гарячих" рахунків отримує більшість трафіку.
+    """
+    if events < 0 or accounts <= 0:
+        raise ValueError("Кількість подій має бути невід'ємною, а рахунків - додатною.")
+    rng = random.Random(seed)
+    mix = method_mix or DEFAULT_METHOD_MIX
+    method_types = list(mix)
+    method_cum_weights = list(accumulate(mix[name] for name in method_types))
+    zipf_cum_weights = list(accumulate(1.0 / (rank ** skew) for rank in range(1, accounts + 1)))
+    # Рахунки створюються рівномірно протягом першої половини потоку
+    create_share = min(1.0, accounts / max(1.0, events * 0.5))
+    mu = math.log(amount_median)
+
+    created = 0
+    for _ in range(events):
+        if created == 0 or (created < accounts and rng.random() < create_share):
+            method_type = rng.choices(method_types, cum_weights=method_cum_weights)[0]
+            initial_balance = round(rng.lognormvariate(mu, 1.0) * 20, 2)
+            yield WorkloadEvent(CREATE, created, initial_balance, method_type)
+            created += 1
+            continue
+        # Ранги Ципфа відповідають порядку створення: ранні рахунки - найгарячіші.
+        # Вибірка лише серед уже створених рангів (як random.choices, але без копії префікса ваг)
+        account = bisect(zipf_cum_weights, rng.random() * zipf_cum_weights[created - 1], 0, created - 1)
+        kind = PAY if rng.random() < pay_share else ADD_FUNDS
+        amount = max(0.01, round(rng.lognormvariate(mu, 1.0), 2))
+        yield WorkloadEvent(kind, account, amount)
+
+
+def save_workload(events: Sequence[WorkloadEvent], path: str):
+    """Зберігає потік у форматі JSON Lines для відтворення інцидентів."""
+    with open(path, "w", encoding="utf-8") as workload_file:
+        for event in events:
+            workload_file.write(json.dumps(event._asdict()) + "\n")
+
+
+def load_workload(path: str) -> List[WorkloadEvent]:
+    with open(path, encoding="utf-8") as workload_file:
+        return [WorkloadEvent(**json.loads(line)) for line in workload_file if line.strip()]
+
+
+def create_account_strategy(account: int, method_type: str, initial_balance: float) -> PaymentStrategy:
+    """Детерміновані реквізити рахунку за його номером."""
+    if method_type == "card":
+        return CreditCardPaymentStrategy(f"4{account:015d}", "12/30", f"{account % 1000:03d}", initial_balance)
+    if method_type == "paypal":
+        return PayPalPaymentStrategy(f"user{account}@example.com", initial_balance)
+    if method_type == "crypto":
+        return CryptoPaymentStrategy(f"bc1qload{account:030d}", initial_balance)
+    raise ValueError(f"Невідомий тип платіжного методу: {method_type}")
+
+
+def balances_checksum(strategies: Sequence[Optional[PaymentStrategy]]) -> str:
+    """
+    SHA-256 від балансів усіх рахунків, округлених до центів.
+    Рахунок, який не вдалося створити (None), входить як "-", тож контрольна
+    сума залишається детермінованою і порівнюваною між версіями.
+    """
+    digest = hashlib.sha256()
+    for account, strategy in enumerate(strategies):
+        balance = "-" if strategy is None else f"{strategy.balance:.2f}"
+        digest.update(f"{account}:{balance}\n".encode("ascii"))
+    return digest.hexdigest()
+
+
+def replay(events: Iterator[WorkloadEvent], rate: Optional[float] = None, quiet: bool = True,
+           processor_factory: Callable[[], PaymentProcessor] = PaymentProcessor) -> Dict[str, object]:
+    """
+    Відтворює потік через PaymentProcessor. Без rate - якнайшвидше; з rate -
+    із заданою кількістю подій на секунду. В режимі rate затримка рахується від
+    запланованого часу події, тож відставання драйвера теж потрапляє у звіт.
+    """
+    # Невдале створення рахунку залишає None, щоб номери наступних рахунків не зсувались
+    strategies: List[Optional[PaymentStrategy]] = []
+    latencies: List[float] = []
+    outcomes = {kind: [0, 0] for kind in (CREATE, PAY, ADD_FUNDS)}  # [успішних, невдалих]
+    interval = 1.0 / rate if rate else 0.0
+    perf_counter = time.perf_counter
+
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext()):
+        processor = processor_factory()
+        started = perf_counter()
+        for index, event in enumerate(events):
+            if interval:
+                scheduled = started + index * interval
+                delay = scheduled - perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                op_started = scheduled
+            else:
+                op_started = perf_counter()
+
+            if event.kind == CREATE:
+                try:
+                    strategy = create_account_strategy(event.account, event.method_type, event.amount)
+                except ValueError:
+                    strategy = None
+                strategies.append(strategy)
+                ok = strategy is not None
+            else:
+                strategy = strategies[event.account] if 0 <= event.account < len(strategies) else None
+                if strategy is None:
+                    ok = False  # Операція над рахунком, якого немає
+                elif event.kind == PAY:
+                    processor.set_strategy(strategy)
+                    ok = processor.process_payment(event.amount)
+                else:
+                    ok = processor.add_funds(strategy, event.amount)
+
+            latencies.append(perf_counter() - op_started)
+            outcomes[event.kind][0 if ok else 1] += 1
+        elapsed = perf_counter() - started
+
+    latencies.sort()
+    return {
+        "events": len(latencies),
+        "accounts": sum(1 for strategy in strategies if strategy is not None),
+        "elapsed_s": elapsed,
+        "events_per_s": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_us": percentile(latencies, 0.50) * 1e6,
+        "p90_us": percentile(latencies, 0.90) * 1e6,
+        "p99_us": percentile(latencies, 0.99) * 1e6,
+        "max_us": (latencies[-1] if latencies else 0.0) * 1e6,
+        "outcomes": {kind: {"ok": ok, "failed": failed} for kind, (ok, failed) in outcomes.items()},
+        "total_balance": round(sum(strategy.balance for strategy in strategies if strategy is not None), 2),
+        "checksum": balances_checksum(strategies),
+    }
+
+
+def print_report(report: Dict[str, object]):
+    print("--- Результати відтворення ---")
+    print(f"Подій: {report['events']}, рахунків: {report['accounts']}, час: {report['elapsed_s']:.2f} с")
+    print(f"Пропускна здатність: {report['events_per_s']:.0f} подій/с")
+    print(f"Затримка p50: {report['p50_us']:.1f} мкс, p90: {report['p90_us']:.1f} мкс, "
+          f"p99: {report['p99_us']:.1f} мкс, макс: {report['max_us']:.1f} мкс")
+    for kind, counts in report["outcomes"].items():
+        print(f"  {kind}: успішних {counts['ok']}, невдалих {counts['failed']}")
+    print(f"Сумарний баланс: ${report['total_balance']:.2f}")
+    print(f"Контрольна сума балансів: {report['checksum']}")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Генерація та відтворення платіжних навантажень.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--events", type=int, default=100000)
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--skew", type=float, default=1.1, help="Параметр Ципфа для гарячих рахунків.")
+    parser.add_argument("--rate", type=float, help="Подій на секунду (за замовчуванням - якнайшвидше).")
+    parser.add_argument("--save", help="Зберегти згенерований потік у файл JSON Lines.")
+    parser.add_argument("--load", help="Відтворити потік з файлу замість генерації.")
+    args = parser.parse_args(argv)
+
+    if args.load:
+        events = load_workload(args.load)
+    else:
+        events = generate_workload(args.seed, args.events, args.accounts, skew=args.skew)
+        if args.save:
+            events = list(events)
+            save_workload(events, args.save)
+    print_report(replay(iter(events), rate=args.rate))
+
+
+if __name__ == "__main__":
+    main()